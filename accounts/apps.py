@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        # Connect the user cache's invalidation handlers in every
+        # process, not just the ones that happen to authenticate.
+        import accounts.authentication  # noqa
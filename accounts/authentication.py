@@ -1,19 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
 from accounts.models import User, Token
 
 
+class UserCache(object):
+    """Remembers which emails belong to existing users.
+
+    AuthenticationMiddleware looks the user up on every request, so
+    this keeps a small per-process LRU of recent emails, each trusted
+    for USER_CACHE_TTL seconds. If USER_CACHE_ALIAS names one of the
+    CACHES, that is checked next and shared between processes. Saving
+    or deleting a User evicts it from both.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _shared_cache(self):
+        if settings.USER_CACHE_ALIAS:
+            return caches[settings.USER_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(email):
+        return f'accounts:user:{email}'
+
+    def get(self, email):
+        with self._lock:
+            expires_at = self._entries.get(email)
+            if expires_at is not None:
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(email)
+                    return _user_from_email(email)
+                del self._entries[email]
+        shared = self._shared_cache()
+        if shared is not None and shared.get(self._key(email)):
+            self._remember(email)
+            return _user_from_email(email)
+        return None
+
+    def add(self, user):
+        self._remember(user.email)
+        shared = self._shared_cache()
+        if shared is not None:
+            shared.set(self._key(user.email), True, settings.USER_CACHE_TTL)
+
+    def _remember(self, email):
+        with self._lock:
+            self._entries[email] = time.monotonic() + settings.USER_CACHE_TTL
+            self._entries.move_to_end(email)
+            while len(self._entries) > settings.USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, email):
+        with self._lock:
+            self._entries.pop(email, None)
+        shared = self._shared_cache()
+        if shared is not None:
+            shared.delete(self._key(email))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _user_from_email(email):
+    # The email is the User's only field, so the cache only needs to
+    # know that the row exists to rebuild it.
+    return User.from_db('default', ['email'], [email])
+
+
+user_cache = UserCache()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.email)
+
+
 class PasswordlessAuthenticationBackend(object):
 
     def authenticate(self, uid):
-        try:
-            token = Token.objects.get(uid=uid)
-            return User.objects.get(email=token.email)
-        except User.DoesNotExist:
-            return User.objects.create(email=token.email)
-        except Token.DoesNotExist:
+        token = Token.consume(uid)
+        if token is None:
             return None
+        # get_or_create reads from the primary, so a user a replica
+        # hasn't seen yet isn't created twice.
+        user, _ = User.objects.get_or_create(email=token.email)
+        return user
 
     def get_user(self, email):
+        user = user_cache.get(email)
+        if user is not None:
+            return user
         try:
-            return User.objects.get(email=email)
+            user = User.objects.get(email=email)
         except User.DoesNotExist:
             return None
+        user_cache.add(user)
+        return user
@@ -0,0 +1,83 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+User = get_user_model()
+
+BENCHMARK_EMAIL = 'session-benchmark@superlists.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        'Time logged-in requests under each session backend in '
+        'SESSION_ENGINES.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Requests to time per backend.'
+        )
+        parser.add_argument(
+            '--path', default='/',
+            help='Page to request.'
+        )
+        parser.add_argument(
+            '--backend', action='append', dest='backends',
+            choices=sorted(settings.SESSION_ENGINES),
+            help='Backend to include; repeat for several. Default: all.'
+        )
+
+    def handle(self, *args, **options):
+        backends = options['backends'] or list(settings.SESSION_ENGINES)
+        user, created = User.objects.get_or_create(email=BENCHMARK_EMAIL)
+        try:
+            self.stdout.write(
+                f'{"backend":<16}{"mean ms":>10}{"p50 ms":>10}'
+                f'{"p95 ms":>10}{"queries":>10}'
+            )
+            for backend in backends:
+                timings, queries = benchmark(
+                    settings.SESSION_ENGINES[backend], user,
+                    options['path'], options['requests'],
+                )
+                timings.sort()
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                self.stdout.write(
+                    f'{backend:<16}'
+                    f'{statistics.mean(timings) * 1000:>10.2f}'
+                    f'{statistics.median(timings) * 1000:>10.2f}'
+                    f'{p95 * 1000:>10.2f}'
+                    f'{queries:>10}'
+                )
+        finally:
+            if created:
+                user.delete()
+
+
+def benchmark(engine, user, path, requests):
+    """Return the time each of `requests` GETs of `path` took as `user`
+    with sessions stored by `engine`, and the queries per request.
+    """
+    host = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'localhost'
+    with override_settings(SESSION_ENGINE=engine):
+        # A new Client loads the session middleware under the override.
+        client = Client(HTTP_HOST=host)
+        client.force_login(user)
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'GET {path} returned {response.status_code}')
+        timings = []
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(requests):
+                started = time.perf_counter()
+                client.get(path)
+                timings.append(time.perf_counter() - started)
+        client.logout()
+    return timings, len(captured) // requests if requests else 0
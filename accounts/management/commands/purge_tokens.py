@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import Token
+
+
+class Command(BaseCommand):
+    help = 'Delete login tokens older than LOGIN_TOKEN_TTL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Tokens to delete per statement.'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between batches.'
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_expired_tokens(options['batch_size'], options['pause'])
+        self.stdout.write(f'Purged {purged} expired tokens')
+
+
+def purge_expired_tokens(batch_size=500, pause=0.0):
+    # Each batch is its own short DELETE by primary key, rather than one
+    # big DELETE that would hold the write lock while it walks the table.
+    cutoff = Token.expiry_cutoff()
+    purged = 0
+    while True:
+        ids = list(
+            Token.objects.filter(created__lt=cutoff).values_list(
+                'pk', flat=True
+            )[:batch_size]
+        )
+        if not ids:
+            return purged
+        deleted, _ = Token.objects.filter(pk__in=ids).delete()
+        purged += deleted
+        if pause:
+            time.sleep(pause)
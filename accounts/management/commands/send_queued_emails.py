@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.outbox import queue_depth, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Send the emails waiting in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Emails to send per SMTP connection.'
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting once it is empty.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Seconds to sleep between polls with --loop.'
+        )
+        parser.add_argument(
+            '--depth', action='store_true',
+            help='Only print how many emails are waiting.'
+        )
+
+    def handle(self, *args, **options):
+        if options['depth']:
+            self.stdout.write(str(queue_depth()))
+            return
+        while True:
+            sent, failed = send_queued_emails(options['batch_size'])
+            if sent or failed or not options['loop']:
+                self.stdout.write(
+                    f'Sent {sent}, failed {failed}, {queue_depth()} queued'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -1,6 +1,9 @@
 import uuid
+from datetime import timedelta
+from django.conf import settings
 from django.contrib import auth
-from django.db import models
+from django.db import models, router
+from django.utils import timezone
 
 auth.signals.user_logged_in.disconnect(auth.models.update_last_login)
 
@@ -15,4 +18,47 @@ class User(models.Model):
 
 class Token(models.Model):
     email = models.EmailField()
-    uid = models.CharField(default=uuid.uuid4, max_length=40)
+    uid = models.CharField(default=uuid.uuid4, max_length=40, unique=True)
+    created = models.DateTimeField(default=timezone.now, db_index=True)
+
+    @staticmethod
+    def expiry_cutoff():
+        return timezone.now() - timedelta(seconds=settings.LOGIN_TOKEN_TTL)
+
+    @staticmethod
+    def consume(uid):
+        """Return the unexpired token with this uid, deleting it so it
+        can't be used again, or None.
+
+        The DELETE only succeeds for one caller, so two requests racing
+        with the same link can't both log in.
+        """
+        # Read from where tokens are written: a replica may not have
+        # caught up with a token created moments ago.
+        token = Token.objects.using(router.db_for_write(Token)).filter(
+            uid=uid, created__gte=Token.expiry_cutoff()
+        ).first()
+        if token is None:
+            return None
+        deleted, _ = Token.objects.filter(pk=token.pk).delete()
+        return token if deleted else None
+
+
+class QueuedEmail(models.Model):
+    """An email waiting in the outbox for `manage.py send_queued_emails`.
+
+    Rows are deleted once sent. One that keeps failing is retried with a
+    growing delay until it has had OUTBOX_MAX_ATTEMPTS, then left in
+    place with its last_error for someone to look at.
+    """
+    subject = models.TextField()
+    body = models.TextField()
+    from_email = models.TextField()
+    to = models.EmailField()
+    created = models.DateTimeField(default=timezone.now)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(default='', blank=True)
+
+    class Meta:
+        ordering = ('id',)
@@ -0,0 +1,113 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import router
+from django.utils import timezone
+
+from accounts.models import QueuedEmail
+
+
+def queue_email(subject, body, from_email, to):
+    """Put an email in the outbox.
+
+    Call this inside the transaction that makes the email worth sending,
+    so it's only queued if that commits.
+    """
+    return QueuedEmail.objects.create(
+        subject=subject, body=body, from_email=from_email, to=to
+    )
+
+
+def pending():
+    return QueuedEmail.objects.filter(
+        attempts__lt=settings.OUTBOX_MAX_ATTEMPTS
+    )
+
+
+def queue_depth():
+    return pending().count()
+
+
+def retry_delay(attempts):
+    return min(
+        settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.OUTBOX_RETRY_MAX_DELAY,
+    )
+
+
+def claim_batch(batch_size):
+    """Lease up to batch_size due emails to this worker.
+
+    Pushing next_attempt_at past the lease in a conditional UPDATE means
+    another worker draining at the same time won't pick them up too.
+    """
+    now = timezone.now()
+    ids = list(
+        pending().filter(next_attempt_at__lte=now).values_list(
+            'pk', flat=True
+        )[:batch_size]
+    )
+    if not ids:
+        return []
+    leased_until = now + timedelta(seconds=settings.OUTBOX_LEASE)
+    pending().filter(pk__in=ids, next_attempt_at__lte=now).update(
+        next_attempt_at=leased_until
+    )
+    # The lease was only just written, so read it back from the primary.
+    return list(QueuedEmail.objects.using(
+        router.db_for_write(QueuedEmail)
+    ).filter(pk__in=ids, next_attempt_at=leased_until))
+
+
+def _failed(email, error):
+    email.attempts += 1
+    email.last_error = f'{type(error).__name__}: {error}'
+    email.next_attempt_at = timezone.now() + timedelta(
+        seconds=retry_delay(email.attempts)
+    )
+    email.save(update_fields=['attempts', 'last_error', 'next_attempt_at'])
+
+
+def send_batch(emails):
+    """Send emails over a single connection. Returns how many were sent."""
+    sent_ids = []
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as error:
+        for email in emails:
+            _failed(email, error)
+        return 0
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, [email.to],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as error:
+                _failed(email, error)
+            else:
+                sent_ids.append(email.pk)
+    finally:
+        connection.close()
+    QueuedEmail.objects.filter(pk__in=sent_ids).delete()
+    return len(sent_ids)
+
+
+def send_queued_emails(batch_size=None):
+    """Send every email that's due, a batch at a time.
+
+    Returns (sent, failed) counts.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            return sent, failed
+        batch_sent = send_batch(emails)
+        sent += batch_sent
+        failed += len(emails) - batch_sent
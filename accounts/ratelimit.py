@@ -0,0 +1,45 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+def client_ip(request):
+    return request.META.get(settings.CLIENT_IP_META_KEY, '')
+
+
+def _key(scope, value, window):
+    # Hash the value so any email address makes a valid cache key.
+    digest = hashlib.sha256(value.encode('utf-8')).hexdigest()
+    return f'ratelimit:{scope}:{digest}:{int(time.time() // window)}'
+
+
+def hit(scope, value):
+    """Count a request against `value`, e.g. an email address, and say
+    whether it's still within the limit set for `scope` in
+    LOGIN_EMAIL_RATE_LIMITS.
+
+    Counts live in fixed windows in the RATELIMIT_CACHE_ALIAS cache, so
+    every worker on the host sees the same totals without touching the
+    database. That needs a cache with atomic add() and incr(); see
+    CACHES.
+    """
+    limit, window = settings.LOGIN_EMAIL_RATE_LIMITS[scope]
+    cache = caches[settings.RATELIMIT_CACHE_ALIAS]
+    key = _key(scope, value, window)
+    cache.add(key, 0, window)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Expired or evicted between the add and the incr.
+        cache.set(key, 1, window)
+        count = 1
+    return count <= limit
+
+
+def login_email_allowed(request, email):
+    # Count both, so a client hammering many addresses can't dodge the
+    # IP limit by never tripping the email one first.
+    results = [hit('email', email.lower()), hit('ip', client_ip(request))]
+    return all(results)
@@ -1,7 +1,13 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
+from django.conf import settings
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
-from accounts.authentication import PasswordlessAuthenticationBackend
+from accounts.authentication import (
+    PasswordlessAuthenticationBackend, user_cache
+)
 from accounts.models import Token
 
 User = get_user_model()
@@ -29,9 +35,28 @@ class AuthenticateTest(TestCase):
         user = PasswordlessAuthenticationBackend().authenticate(token.uid)
         self.assertEqual(user, existing_user)
 
+    def test_token_only_works_once(self):
+        token = Token.objects.create(email='edith@example.com')
+        PasswordlessAuthenticationBackend().authenticate(token.uid)
+        self.assertIsNone(
+            PasswordlessAuthenticationBackend().authenticate(token.uid)
+        )
+
+    def test_returns_None_if_token_has_expired(self):
+        token = Token.objects.create(
+            email='edith@example.com',
+            created=timezone.now() - timedelta(seconds=settings.LOGIN_TOKEN_TTL + 1)
+        )
+        self.assertIsNone(
+            PasswordlessAuthenticationBackend().authenticate(token.uid)
+        )
+
 
 class GetUserTest(TestCase):
 
+    def setUp(self):
+        user_cache.clear()
+
     def test_gets_user_by_email(self):
         User.objects.create(email='another@example.com')
         desired_user = User.objects.create(email='edith@example.com')
@@ -42,3 +67,70 @@ class GetUserTest(TestCase):
         self.assertIsNone(
             PasswordlessAuthenticationBackend().get_user('edith@example.com')
         )
+
+
+@override_settings(USER_CACHE_ALIAS=None)
+class GetUserCacheTest(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.backend = PasswordlessAuthenticationBackend()
+        User.objects.create(email='edith@example.com')
+
+    def test_second_lookup_skips_the_database(self):
+        self.backend.get_user('edith@example.com')
+        with self.assertNumQueries(0):
+            user = self.backend.get_user('edith@example.com')
+        self.assertEqual(user, User.objects.get(email='edith@example.com'))
+
+    def test_missing_users_are_not_cached(self):
+        self.assertIsNone(self.backend.get_user('nobody@example.com'))
+        User.objects.create(email='nobody@example.com')
+        self.assertIsNotNone(self.backend.get_user('nobody@example.com'))
+
+    def test_deleting_user_invalidates_entry(self):
+        self.backend.get_user('edith@example.com')
+        User.objects.get(email='edith@example.com').delete()
+        self.assertIsNone(self.backend.get_user('edith@example.com'))
+
+    def test_saving_user_invalidates_entry(self):
+        self.backend.get_user('edith@example.com')
+        User.objects.get(email='edith@example.com').save()
+        with self.assertNumQueries(1):
+            self.backend.get_user('edith@example.com')
+
+    def test_entries_expire_after_ttl(self):
+        with patch('accounts.authentication.time.monotonic') as monotonic:
+            monotonic.return_value = 1000
+            self.backend.get_user('edith@example.com')
+            monotonic.return_value = 1000 + settings.USER_CACHE_TTL + 1
+            with self.assertNumQueries(1):
+                self.backend.get_user('edith@example.com')
+
+    @override_settings(USER_CACHE_SIZE=2)
+    def test_least_recently_used_entry_is_evicted(self):
+        User.objects.create(email='a@example.com')
+        User.objects.create(email='b@example.com')
+        self.backend.get_user('edith@example.com')
+        self.backend.get_user('a@example.com')
+        self.backend.get_user('edith@example.com')
+        self.backend.get_user('b@example.com')
+        with self.assertNumQueries(0):
+            self.backend.get_user('edith@example.com')
+        with self.assertNumQueries(1):
+            self.backend.get_user('a@example.com')
+
+    @override_settings(USER_CACHE_ALIAS='default')
+    def test_shared_cache_is_used_after_local_miss(self):
+        self.backend.get_user('edith@example.com')
+        user_cache.clear()
+        with self.assertNumQueries(0):
+            user = self.backend.get_user('edith@example.com')
+        self.assertEqual(user.email, 'edith@example.com')
+
+    @override_settings(USER_CACHE_ALIAS='default')
+    def test_deleting_user_invalidates_shared_cache(self):
+        self.backend.get_user('edith@example.com')
+        User.objects.get(email='edith@example.com').delete()
+        user_cache.clear()
+        self.assertIsNone(self.backend.get_user('edith@example.com'))
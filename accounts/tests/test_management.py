@@ -0,0 +1,40 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.management.commands.purge_tokens import purge_expired_tokens
+from accounts.models import Token
+
+
+class PurgeTokensTest(TestCase):
+
+    def create_expired_token(self):
+        return Token.objects.create(
+            email='a@b.com',
+            created=timezone.now() - timedelta(seconds=settings.LOGIN_TOKEN_TTL + 1)
+        )
+
+    def test_deletes_only_expired_tokens(self):
+        self.create_expired_token()
+        fresh = Token.objects.create(email='a@b.com')
+        self.assertEqual(purge_expired_tokens(), 1)
+        self.assertEqual(list(Token.objects.all()), [fresh])
+
+    def test_deletes_in_batches(self):
+        for _ in range(5):
+            self.create_expired_token()
+        # three batches of SELECT and DELETE, then an empty SELECT
+        with self.assertNumQueries(7):
+            purged = purge_expired_tokens(batch_size=2)
+        self.assertEqual(purged, 5)
+        self.assertFalse(Token.objects.exists())
+
+    def test_command_reports_count(self):
+        self.create_expired_token()
+        stdout = StringIO()
+        call_command('purge_tokens', stdout=stdout)
+        self.assertIn('Purged 1 expired tokens', stdout.getvalue())
@@ -1,5 +1,9 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError
 from django.test import TestCase
 from django.contrib import auth
+from django.utils import timezone
 
 from accounts.models import Token
 
@@ -32,6 +36,24 @@ class TokenModelTest(TestCase):
         token2 = Token.objects.create(email='a@b.com')
         self.assertNotEqual(token1.uid, token2.uid)
 
+    def test_uid_is_unique(self):
+        token = Token.objects.create(email='a@b.com')
+        with self.assertRaises(IntegrityError):
+            Token.objects.create(email='c@d.com', uid=token.uid)
+
+    def test_consume_returns_token_once(self):
+        token = Token.objects.create(email='a@b.com')
+        self.assertEqual(Token.consume(token.uid), token)
+        self.assertIsNone(Token.consume(token.uid))
+        self.assertFalse(Token.objects.exists())
+
+    def test_consume_ignores_expired_tokens(self):
+        token = Token.objects.create(
+            email='a@b.com',
+            created=timezone.now() - timedelta(seconds=settings.LOGIN_TOKEN_TTL + 1)
+        )
+        self.assertIsNone(Token.consume(token.uid))
+
 
 # Your tests can be a form of documentation for your code—they
 # express what your requirements are of a particular class or
@@ -0,0 +1,149 @@
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import QueuedEmail
+from accounts.outbox import (
+    claim_batch, queue_depth, queue_email, retry_delay, send_queued_emails
+)
+
+try:
+    import asyncore
+    import smtpd
+except ImportError:  # removed in Python 3.12
+    smtpd = None
+
+
+def queue(to='edith@example.com'):
+    return queue_email('subject', 'body', 'noreply@superlists', to)
+
+
+class QueueTest(TestCase):
+
+    def test_queue_depth_counts_pending_emails(self):
+        queue()
+        queue()
+        QueuedEmail.objects.create(
+            subject='s', body='b', from_email='f', to='a@b.com',
+            attempts=settings.OUTBOX_MAX_ATTEMPTS,
+        )
+        self.assertEqual(queue_depth(), 2)
+
+    def test_claimed_emails_are_not_claimed_again(self):
+        queue()
+        self.assertEqual(len(claim_batch(10)), 1)
+        self.assertEqual(claim_batch(10), [])
+
+    def test_retry_delay_doubles_up_to_maximum(self):
+        self.assertEqual(retry_delay(1), settings.OUTBOX_RETRY_DELAY)
+        self.assertEqual(retry_delay(2), settings.OUTBOX_RETRY_DELAY * 2)
+        self.assertEqual(retry_delay(50), settings.OUTBOX_RETRY_MAX_DELAY)
+
+
+class SendQueuedEmailsTest(TestCase):
+
+    def test_sends_and_deletes_queued_emails(self):
+        queue('a@example.com')
+        queue('b@example.com')
+        self.assertEqual(send_queued_emails(), (2, 0))
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [['a@example.com'], ['b@example.com']]
+        )
+        self.assertEqual(QueuedEmail.objects.count(), 0)
+
+    def test_skips_emails_not_yet_due(self):
+        email = queue()
+        email.next_attempt_at = timezone.now() + timedelta(minutes=1)
+        email.save()
+        self.assertEqual(send_queued_emails(), (0, 0))
+        self.assertEqual(len(mail.outbox), 0)
+
+    @patch('django.core.mail.message.EmailMessage.send')
+    def test_failed_send_is_retried_later(self, mock_send):
+        mock_send.side_effect = OSError('connection reset')
+        queue()
+        self.assertEqual(send_queued_emails(), (0, 1))
+        email = QueuedEmail.objects.get()
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('connection reset', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_sends_in_batches(self):
+        for _ in range(5):
+            queue()
+        with patch('accounts.outbox.get_connection',
+                   wraps=mail.get_connection) as mock_get_connection:
+            send_queued_emails(batch_size=2)
+        self.assertEqual(mock_get_connection.call_count, 3)
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_command_reports_counts(self):
+        queue()
+        out = StringIO()
+        call_command('send_queued_emails', stdout=out)
+        self.assertEqual(out.getvalue().strip(), 'Sent 1, failed 0, 0 queued')
+
+    def test_command_reports_depth(self):
+        queue()
+        out = StringIO()
+        call_command('send_queued_emails', '--depth', stdout=out)
+        self.assertEqual(out.getvalue().strip(), '1')
+        self.assertEqual(len(mail.outbox), 0)
+
+
+if smtpd is not None:
+    class SinkServer(smtpd.SMTPServer):
+
+        def __init__(self):
+            super().__init__(('127.0.0.1', 0), None, decode_data=True)
+            self.connections = 0
+            self.messages = []
+
+        def handle_accepted(self, conn, addr):
+            self.connections += 1
+            super().handle_accepted(conn, addr)
+
+        def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+            self.messages.append((mailfrom, rcpttos, data))
+
+
+@skipIf(smtpd is None, 'smtpd is not available')
+class SMTPSinkTest(TestCase):
+
+    def setUp(self):
+        self.sink = SinkServer()
+        self.thread = threading.Thread(
+            target=asyncore.loop, kwargs={'timeout': 0.05}, daemon=True
+        )
+        self.thread.start()
+
+    def tearDown(self):
+        self.sink.close()
+        self.thread.join()
+
+    def test_sends_batch_over_one_smtp_connection(self):
+        for to in ('a@example.com', 'b@example.com', 'c@example.com'):
+            queue(to)
+        with override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.sink.socket.getsockname()[1],
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+        ):
+            self.assertEqual(send_queued_emails(), (3, 0))
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(
+            [rcpttos for _, rcpttos, _ in self.sink.messages],
+            [['a@example.com'], ['b@example.com'], ['c@example.com']]
+        )
@@ -0,0 +1,49 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from superlists.cache import LockedFileBasedCache
+
+
+def _increment(directory, times):
+    cache = LockedFileBasedCache(directory, {})
+    for _ in range(times):
+        cache.incr('count')
+
+
+class LockedFileBasedCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.cache = LockedFileBasedCache(self.dir, {})
+
+    def test_concurrent_increments_are_not_lost(self):
+        self.cache.add('count', 0, 60)
+        workers = [
+            multiprocessing.Process(target=_increment, args=(self.dir, 100))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('count'), 400)
+
+    def test_incr_keeps_expiry(self):
+        self.cache.add('count', 0, 1)
+        self.assertEqual(self.cache.incr('count'), 1)
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get('count'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('count')
+
+    def test_add_only_sets_missing_keys(self):
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+
+from functional_tests.management.commands.create_session import (
+    create_pre_authenticated_session
+)
+
+User = get_user_model()
+
+
+class PreAuthenticatedSessionTest(TestCase):
+
+    def setUp(self):
+        caches['sessions'].clear()
+
+    def assert_session_logs_in(self, backend):
+        with override_settings(
+            SESSION_ENGINE=settings.SESSION_ENGINES[backend]
+        ):
+            session_key = create_pre_authenticated_session(
+                f'{backend}@example.com'
+            )
+            # SessionMiddleware picks its engine when the client's
+            # handler first loads, so each backend needs a new client.
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            response = client.get('/')
+        self.assertEqual(response.context['user'].email, f'{backend}@example.com')
+
+    def test_works_with_every_backend(self):
+        for backend in settings.SESSION_ENGINES:
+            with self.subTest(backend=backend):
+                self.assert_session_logs_in(backend)
+
+    def test_cache_sessions_are_kept_out_of_the_default_cache(self):
+        with override_settings(
+            SESSION_ENGINE=settings.SESSION_ENGINES['cache']
+        ):
+            session_key = create_pre_authenticated_session('a@example.com')
+            cache.clear()
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            response = client.get('/')
+        self.assertEqual(response.context['user'].email, 'a@example.com')
+
+    def test_signed_cookie_sessions_skip_the_session_table(self):
+        with override_settings(
+            SESSION_ENGINE=settings.SESSION_ENGINES['signed_cookies']
+        ):
+            session_key = create_pre_authenticated_session('a@example.com')
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+            self.client.get('/')
+            with self.assertNumQueries(0):
+                self.client.get('/')
+
+
+class BenchmarkSessionsCommandTest(TestCase):
+
+    def test_reports_each_backend_and_cleans_up(self):
+        stdout = StringIO()
+        call_command(
+            'benchmark_sessions', '--requests', '2',
+            '--backend', 'db', '--backend', 'signed_cookies',
+            stdout=stdout
+        )
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines],
+            ['backend', 'db', 'signed_cookies']
+        )
+        self.assertFalse(User.objects.exists())
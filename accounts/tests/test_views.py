@@ -1,13 +1,19 @@
 from unittest.mock import patch, call
-from django.test import TestCase
+from django.core import mail
+from django.core.cache import cache, caches
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
 from unittest.mock import patch
 
 import accounts.views
-from accounts.models import Token
+from accounts.models import QueuedEmail, Token
 
 
 class SendLoginEmailViewTest(TestCase):
 
+    def setUp(self):
+        caches['ratelimit'].clear()
+
     def test_redirects_to_home_page(self):
         response = self.client.post(
             '/accounts/send_login_email',
@@ -29,18 +35,18 @@ class SendLoginEmailViewTest(TestCase):
         )
         self.assertEqual(message.tags, "success")
 
-    @patch('accounts.views.send_mail')  # 1
-    def test_sends_email_to_address_from_post(self, mock_send_mail):  # 2
+    @patch('accounts.views.queue_email')  # 1
+    def test_sends_email_to_address_from_post(self, mock_queue_email):  # 2
         self.client.post(
             '/accounts/send_login_email',
             data={'email': 'edith@example.com'}  # 3
         )
 
-        self.assertEqual(mock_send_mail.called, True)  # 4
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args  # 5
+        self.assertEqual(mock_queue_email.called, True)  # 4
+        (subject, body, from_email, to), kwargs = mock_queue_email.call_args  # 5
         self.assertEqual(subject, 'Your login link for Superlists')
         self.assertEqual(from_email, 'noreply@superlists')
-        self.assertEqual(to_list, ['edith@example.com'])
+        self.assertEqual(to, 'edith@example.com')
 
         # 1. The patch decorator takes a dot-notation name of an
         #   object to monkeypatch. That’s the equivalent of manually
@@ -78,17 +84,98 @@ class SendLoginEmailViewTest(TestCase):
         token = Token.objects.first()
         self.assertEqual(token.email, 'edith@example.com')
 
-    @patch('accounts.views.send_mail')
-    def test_sends_link_to_login_using_token_uid(self, mock_send_mail):
+    @patch('accounts.views.queue_email')
+    def test_sends_link_to_login_using_token_uid(self, mock_queue_email):
         self.client.post(
             '/accounts/send_login_email',
             data={'email': 'edith@example.com'}
         )
         token = Token.objects.first()
         expected_url = f'http://testserver/accounts/login?token={token.uid}'
-        (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
+        (subject, body, from_email, to), kwargs = mock_queue_email.call_args
         self.assertIn(expected_url, body)
 
+    def test_queues_email_without_sending_it(self):
+        self.client.post(
+            '/accounts/send_login_email',
+            data={'email': 'edith@example.com'}
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.to, 'edith@example.com')
+
+    @patch('accounts.views.queue_email')
+    def test_no_token_is_kept_if_queueing_fails(self, mock_queue_email):
+        mock_queue_email.side_effect = DatabaseError
+        with self.assertRaises(DatabaseError), \
+                self.assertLogs('django.request', 'ERROR'):
+            self.client.post(
+                '/accounts/send_login_email',
+                data={'email': 'edith@example.com'}
+            )
+        self.assertEqual(Token.objects.count(), 0)
+
+
+@override_settings(LOGIN_EMAIL_RATE_LIMITS={'email': (2, 60), 'ip': (3, 60)})
+class SendLoginEmailRateLimitTest(TestCase):
+
+    def setUp(self):
+        caches['ratelimit'].clear()
+
+    def post(self, email, ip='10.0.0.1'):
+        return self.client.post(
+            '/accounts/send_login_email',
+            data={'email': email},
+            REMOTE_ADDR=ip,
+            follow=True
+        )
+
+    def test_rejects_too_many_requests_for_one_email(self):
+        self.post('edith@example.com', ip='10.0.0.1')
+        self.post('edith@example.com', ip='10.0.0.2')
+        response = self.post('edith@example.com', ip='10.0.0.3')
+        self.assertEqual(Token.objects.count(), 2)
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+        message = list(response.context['messages'])[0]
+        self.assertEqual(message.tags, 'warning')
+        self.assertIn('Too many', message.message)
+
+    def test_rejects_too_many_requests_from_one_ip(self):
+        for n in range(4):
+            self.post(f'user{n}@example.com')
+        self.assertEqual(Token.objects.count(), 3)
+
+    def test_email_limit_ignores_case(self):
+        self.post('edith@example.com', ip='10.0.0.1')
+        self.post('Edith@Example.com', ip='10.0.0.2')
+        self.post('EDITH@example.com', ip='10.0.0.3')
+        self.assertEqual(Token.objects.count(), 2)
+
+    def test_other_clients_are_unaffected(self):
+        for _ in range(3):
+            self.post('edith@example.com')
+        self.post('francis@example.com', ip='10.0.0.2')
+        self.assertTrue(
+            Token.objects.filter(email='francis@example.com').exists()
+        )
+
+    def test_counts_are_kept_out_of_the_default_cache(self):
+        self.post('edith@example.com', ip='10.0.0.1')
+        self.post('edith@example.com', ip='10.0.0.2')
+        cache.clear()
+        self.post('edith@example.com', ip='10.0.0.3')
+        self.assertEqual(Token.objects.count(), 2)
+
+    def test_rejection_does_not_touch_the_database(self):
+        self.post('edith@example.com', ip='10.0.0.1')
+        self.post('edith@example.com', ip='10.0.0.2')
+        with self.assertNumQueries(0):
+            self.client.post(
+                '/accounts/send_login_email',
+                data={'email': 'edith@example.com'},
+                REMOTE_ADDR='10.0.0.3',
+            )
+
 
 @patch('accounts.views.auth')  # 1
 class LoginViewTest(TestCase):
@@ -1,29 +1,41 @@
-from django.core.mail import send_mail
 from django.core.urlresolvers import reverse
 from django.contrib import auth, messages
+from django.db import transaction
 from django.shortcuts import redirect
 
 from accounts.models import Token
+from accounts.outbox import queue_email
+from accounts.ratelimit import login_email_allowed
+from superlists.routers import note_write
 
 
 def send_login_email(request):
     email = request.POST['email']
-    token = Token.objects.create(email=email)
-    url = request.build_absolute_uri(
-        f"{reverse('login')}?token={str(token.uid)}"
-    )
-    # request.build_absolute_uri deserves a mention—it’s one way to
-    # build a “full” URL, including the domain name and the http(s)
-    # part, in Django. There are other ways, but they usually involve
-    # getting into the “sites” framework, and that gets
-    # overcomplicated pretty quickly.
-    message_body = f'Use this link to log in:\n\n{url}'
-    send_mail(
-        'Your login link for Superlists',
-        message_body,
-        'noreply@superlists',
-        [email],
-    )
+    if not login_email_allowed(request, email):
+        messages.warning(
+            request,
+            "Too many login emails requested, please try again later."
+        )
+        return redirect('/')
+    with transaction.atomic():
+        token = Token.objects.create(email=email)
+        url = request.build_absolute_uri(
+            f"{reverse('login')}?token={str(token.uid)}"
+        )
+        # request.build_absolute_uri deserves a mention—it’s one way to
+        # build a “full” URL, including the domain name and the http(s)
+        # part, in Django. There are other ways, but they usually involve
+        # getting into the “sites” framework, and that gets
+        # overcomplicated pretty quickly.
+
+        # The email goes out from `manage.py send_queued_emails`, so a
+        # slow SMTP server can't hold up the request.
+        queue_email(
+            'Your login link for Superlists',
+            f'Use this link to log in:\n\n{url}',
+            'noreply@superlists',
+            email,
+        )
     messages.success(
         request,
         "Check your email, we've sent you a link you can use to log in."
@@ -32,6 +44,9 @@ def send_login_email(request):
 
 
 def login(request):
+    # Using the link deletes its token and may create the user, so the
+    # client's next reads have to come from the primary.
+    note_write(request)
     user = auth.authenticate(uid=request.GET.get('token'))
     if user:
         auth.login(request, user)
@@ -1,6 +1,7 @@
+from importlib import import_module
+
 from django.conf import settings
 from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY, get_user_model
-from django.contrib.sessions.backends.db import SessionStore
 from django.core.management.base import BaseCommand
 
 User = get_user_model()
@@ -18,7 +19,9 @@ class Command(BaseCommand):
 
 def create_pre_authenticated_session(email):
     user = User.objects.create(email=email)
-    session = SessionStore()
+    # Whichever engine is configured, session_key after save() is the
+    # cookie value; for signed cookies it carries the session itself.
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
     session[SESSION_KEY] = user.pk
     session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
     session.save()
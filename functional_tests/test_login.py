@@ -11,6 +11,7 @@ import pickle
 import re
 import time
 
+from accounts.outbox import send_queued_emails
 
 from .base import FunctionalTest
 
@@ -105,6 +106,7 @@ class LoginTest(FunctionalTest):
 
     def wait_for_email(self, test_email, subject):
         if not self.staging_server:
+            send_queued_emails()
             email = mail.outbox[0]
             self.assertIn(test_email, email.to)
             self.assertEqual(email.subject, subject)
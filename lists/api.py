@@ -0,0 +1,131 @@
+import json
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from lists.forms import (
+    INVALID_SHAREE_ERROR, ExistingListItemForm, NewListForm, parse_sharees
+)
+from lists.models import List, ListSnapshot, get_list_cache_version
+from superlists.routers import pin_to_primary
+from superlists.transactions import write_transaction
+
+
+INVALID_BODY_ERROR = 'The request body must be a JSON object'
+INVALID_SHAREE_TYPE_ERROR = 'sharee must be a string or a list of strings'
+
+
+def _request_data(request):
+    """The POSTed form data or JSON object, or None if the JSON body is
+    something other than an object."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _invalid_body():
+    return JsonResponse(
+        {'errors': {'__all__': [INVALID_BODY_ERROR]}}, status=400
+    )
+
+
+def _errors_json(form):
+    return {field: list(errors) for field, errors in form.errors.items()}
+
+
+def _list_json(snapshot):
+    return {
+        'id': snapshot.list.id,
+        'url': snapshot.list.get_absolute_url(),
+        'name': snapshot.list.name,
+        'owner': snapshot.owner_email,
+        'item_count': snapshot.list.item_count,
+        'items': [
+            {'id': item.id, 'text': item.text} for item in snapshot.items
+        ],
+        'shared_with': snapshot.sharee_emails,
+    }
+
+
+def _list_etag(request, list_id):
+    # The list's cache version changes whenever its items, sharees or
+    # owner do, so it can stand in for a hash of the response, and a
+    # revalidation costs one cache lookup and no queries. view_list
+    # reads the response from the primary, as a lagging replica could
+    # still have the list from before the version changed.
+    return f'"{list_id}-{get_list_cache_version(list_id)}"'
+
+
+@require_POST
+@write_transaction
+def new_list(request):
+    data = _request_data(request)
+    if data is None:
+        return _invalid_body()
+    form = NewListForm(data=data)
+    if form.is_valid():
+        list_ = form.save(owner=request.user)
+        return JsonResponse(_list_json(ListSnapshot(list_)), status=201)
+    return JsonResponse({'errors': _errors_json(form)}, status=400)
+
+
+@require_GET
+@ensure_csrf_cookie
+@condition(etag_func=_list_etag)
+def view_list(request, list_id):
+    with pin_to_primary():
+        snapshot = ListSnapshot(
+            get_object_or_404(List.objects.on_shard(list_id), id=list_id)
+        )
+        return JsonResponse(_list_json(snapshot))
+
+
+@require_POST
+@write_transaction
+def add_item(request, list_id):
+    list_ = get_object_or_404(List.objects.on_shard(list_id), id=list_id)
+    data = _request_data(request)
+    if data is None:
+        return _invalid_body()
+    form = ExistingListItemForm(for_list=list_, data=data)
+    if form.is_valid():
+        item = form.save()
+        if item:
+            return JsonResponse({'id': item.id, 'text': item.text}, status=201)
+    return JsonResponse({'errors': _errors_json(form)}, status=400)
+
+
+@require_POST
+@write_transaction
+def share_list(request, list_id):
+    list_ = get_object_or_404(List.objects.on_shard(list_id), id=list_id)
+    data = _request_data(request)
+    if data is None:
+        return _invalid_body()
+    if hasattr(data, 'getlist'):
+        values = data.getlist('sharee')
+    else:
+        values = data.get('sharee') or []
+        if isinstance(values, str):
+            values = [values]
+        if not isinstance(values, list) or not all(
+            isinstance(value, str) for value in values
+        ):
+            return JsonResponse({'errors': {'sharee': [
+                INVALID_SHAREE_TYPE_ERROR
+            ]}}, status=400)
+    sharees, invalid = parse_sharees(values)
+    if invalid:
+        return JsonResponse({'errors': {'sharee': [
+            INVALID_SHAREE_ERROR.format(email) for email in invalid
+        ]}}, status=400)
+    if not sharees:
+        return JsonResponse({'errors': {'sharee': ['required']}}, status=400)
+    list_.share_with(sharees)
+    return JsonResponse(_list_json(ListSnapshot(list_)))
@@ -0,0 +1,9 @@
+from django.conf.urls import url
+from lists import api
+
+urlpatterns = [
+    url(r'^new$', api.new_list, name='api_new_list'),
+    url(r'^(\d+)/$', api.view_list, name='api_view_list'),
+    url(r'^(\d+)/items$', api.add_item, name='api_add_item'),
+    url(r'^(\d+)/share$', api.share_list, name='api_share_list'),
+]
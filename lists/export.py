@@ -0,0 +1,49 @@
+"""Streaming exports of a list's items.
+
+Each exporter is a generator of text chunks, one per chunk of items
+from List.item_chunks, so a StreamingHttpResponse can send a list of
+any length without ever holding it all in memory.
+"""
+import csv
+import json
+
+
+class _Echo(object):
+    # csv.writer wants a file; this one hands each row straight back.
+    def write(self, value):
+        return value
+
+
+def csv_export(list_):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['id', 'text'])
+    for chunk in list_.item_chunks():
+        yield ''.join(writer.writerow([item.id, item.text]) for item in chunk)
+
+
+def json_export(list_):
+    yield '{"id": %s, "name": %s, "items": [' % (
+        json.dumps(list_.id), json.dumps(list_.name)
+    )
+    separator = ''
+    for chunk in list_.item_chunks():
+        yield separator + ', '.join(
+            json.dumps({'id': item.id, 'text': item.text}) for item in chunk
+        )
+        separator = ', '
+    yield ']}'
+
+
+def ndjson_export(list_):
+    for chunk in list_.item_chunks():
+        yield ''.join(
+            json.dumps({'id': item.id, 'text': item.text}) + '\n'
+            for item in chunk
+        )
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', csv_export),
+    'json': ('application/json', json_export),
+    'ndjson': ('application/x-ndjson', ndjson_export),
+}
@@ -1,11 +1,35 @@
+import re
+
 from django import forms
 from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, router
 
 from lists.models import Item, List
+from superlists.transactions import immediate_atomic
 
 
 DUPLICATE_ITEM_ERROR = "You've already got this in your list"
 EMPTY_ITEM_ERROR = "You can't have an empty list item"
+INVALID_SHAREE_ERROR = "Couldn't share with {}: not a valid email address"
+
+
+def parse_sharees(values):
+    """Split sharee fields, each of which may hold several addresses
+    separated by commas or whitespace, into (valid, invalid) lists.
+    """
+    valid, invalid = [], []
+    for value in values:
+        for email in re.split(r'[\s,;]+', value):
+            if not email:
+                continue
+            try:
+                validate_email(email)
+            except ValidationError:
+                invalid.append(email)
+            else:
+                valid.append(email)
+    return valid, invalid
 
 
 class ItemForm(forms.models.ModelForm):
@@ -46,11 +70,27 @@ class ExistingListItemForm(ItemForm):
         self.instance.list = for_list
 
     def validate_unique(self):
+        # Rather than SELECTing for a duplicate first, save() lets the
+        # unique_together constraint catch it. That's one query fewer,
+        # and it can't be raced by another request adding the same item.
+        pass
+
+    def save(self):
+        using = router.db_for_write(Item, instance=self.instance)
         try:
-            self.instance.validate_unique()
-        except ValidationError as e:
-            e.error_dict = {'text': [DUPLICATE_ITEM_ERROR]}
-            self._update_errors(e)
+            with immediate_atomic(using=using):
+                return super().save()
+        except IntegrityError:
+            # The constraint is on the text's hash, so check the text
+            # itself matches before calling it a duplicate.
+            if not Item.objects.using(using).filter(
+                list=self.instance.list,
+                text_hash=self.instance.text_hash,
+                text=self.instance.text,
+            ).exists():
+                raise
+            self.add_error('text', DUPLICATE_ITEM_ERROR)
+            return None
 
 
 #           Hiding ORM Code Behind Helper Methods
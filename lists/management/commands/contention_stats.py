@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from superlists.transactions import contention_stats, reset_contention_stats
+
+
+class Command(BaseCommand):
+    help = (
+        'Show how often write transactions found the database locked '
+        '(busy) and how often they gave up retrying (failed).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Zero the counters after showing them.'
+        )
+
+    def handle(self, *args, **options):
+        for event, count in contention_stats().items():
+            self.stdout.write(f'{event}: {count}')
+        if options['reset']:
+            reset_contention_stats()
@@ -0,0 +1,149 @@
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+
+from lists.models import Item, List, text_digest
+from lists.sharding import allocate_list_ids, is_sharded, shard_for_list
+from superlists.transactions import immediate_atomic
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-load lists from newline-delimited JSON, one list per line: '
+        '{"owner": "someone@example.com", "items": ["first", "second"]}. '
+        '"owner" is optional.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='File to read, or - (the default) for stdin.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Lists to insert per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            lines = sys.stdin
+        else:
+            lines = open(options['path'], encoding='utf-8')
+        started = time.time()
+        list_count = item_count = 0
+        with lines:
+            records = (
+                _parse(line, number)
+                for number, line in enumerate(lines, start=1)
+                if line.strip()
+            )
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                item_count += load_batch(batch)
+                list_count += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{list_count} lists loaded...')
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                no_style(), [List, Item]
+            ):
+                cursor.execute(sql)
+        elapsed = time.time() - started
+        rate = (list_count + item_count) / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Loaded {list_count} lists and {item_count} items '
+            f'in {elapsed:.1f}s ({rate:.0f} rows/sec)'
+        )
+
+
+def _parse(line, number):
+    try:
+        record = json.loads(line)
+        owner = record.get('owner')
+        items = record['items']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise CommandError(f'Line {number} is not a valid list record')
+    # A string is iterable too, and would load one item per character.
+    if (
+        not isinstance(items, list)
+        or not all(isinstance(text, str) for text in items)
+        or not isinstance(owner, (str, type(None)))
+    ):
+        raise CommandError(f'Line {number} is not a valid list record')
+    texts = [text.strip() for text in items]
+    # Blank items and repeats of the same text would break the
+    # (list, text) constraint, so drop them here rather than in the DB.
+    seen = set()
+    unique_texts = []
+    for text in texts:
+        if text and text not in seen:
+            seen.add(text)
+            unique_texts.append(text)
+    return owner, unique_texts
+
+
+def load_batch(batch):
+    """Insert a batch of (owner, texts) lists, returning the item count.
+
+    bulk_create can't report back autoincrement ids on SQLite, so list
+    ids are allocated up front from the current maximum. That's done
+    inside the transaction, so a concurrent writer makes the batch
+    fail rather than collide. With several shards the ids come from
+    allocate_list_ids instead, and each shard gets its own transaction.
+    """
+    with transaction.atomic():
+        owners = {owner for owner, texts in batch if owner}
+        existing = set(User.objects.filter(
+            email__in=owners
+        ).values_list('email', flat=True))
+        User.objects.bulk_create(
+            User(email=email) for email in owners - existing
+        )
+        if not is_sharded():
+            next_id = (List.objects.aggregate(Max('id'))['id__max'] or 0) + 1
+            lists, items = _build(batch, range(next_id, next_id + len(batch)))
+            List.objects.bulk_create(lists)
+            Item.objects.bulk_create(items)
+            return len(items)
+    by_shard = {}
+    for list_id, record in zip(allocate_list_ids(len(batch)), batch):
+        by_shard.setdefault(shard_for_list(list_id), []).append(
+            (list_id, record)
+        )
+    item_count = 0
+    for alias, rows in by_shard.items():
+        ids, records = zip(*rows)
+        lists, items = _build(records, ids)
+        with immediate_atomic(using=alias):
+            List.objects.using(alias).bulk_create(lists)
+            Item.objects.using(alias).bulk_create(items)
+        item_count += len(items)
+    return item_count
+
+
+def _build(records, ids):
+    lists = []
+    items = []
+    for list_id, (owner, texts) in zip(ids, records):
+        lists.append(List(
+            id=list_id,
+            owner_id=owner,
+            name=texts[0] if texts else '',
+            item_count=len(texts),
+        ))
+        items.extend(
+            Item(list_id=list_id, text=text, text_hash=text_digest(text))
+            for text in texts
+        )
+    return lists, items
@@ -0,0 +1,83 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from lists.models import Item, List, bump_list_cache_version
+from lists.sharding import on_every_shard
+
+
+class Command(BaseCommand):
+    help = 'Check List.item_count against the items, and optionally fix it.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair', action='store_true',
+            help='Recount the lists whose item_count is wrong.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Lists to check per query.'
+        )
+
+    def handle(self, *args, **options):
+        drifted = find_drifted_lists(options['batch_size'])
+        for list_id, stored, actual in drifted:
+            self.stdout.write(
+                f'List {list_id}: item_count is {stored}, counted {actual}'
+            )
+        if options['repair'] and drifted:
+            repaired = repair_item_counts(
+                [list_id for list_id, _, _ in drifted]
+            )
+            self.stdout.write(f'Repaired {repaired} lists')
+        elif not drifted:
+            self.stdout.write('All item counts are correct')
+
+
+def _counted():
+    # The subquery runs as part of the outer query, so on the same shard.
+    return Coalesce(Subquery(
+        Item.objects.filter(list=OuterRef('pk')).order_by().values(
+            'list'
+        ).annotate(count=Count('id')).values('count')
+    ), Value(0))
+
+
+def find_drifted_lists(batch_size=1000):
+    """Return (list id, stored count, actual count) for every list whose
+    item_count is wrong, checking batch_size lists per query.
+    """
+    drifted = []
+    for lists in on_every_shard(List.objects.all()):
+        last_id = 0
+        while True:
+            batch = list(
+                lists.filter(id__gt=last_id).order_by('id').annotate(
+                    actual=_counted()
+                ).values_list('id', 'item_count', 'actual')[:batch_size]
+            )
+            drifted.extend(row for row in batch if row[1] != row[2])
+            if len(batch) < batch_size:
+                break
+            last_id = batch[-1][0]
+    return sorted(drifted)
+
+
+def repair_item_counts(list_ids, batch_size=500):
+    # Recount in the UPDATE itself, so items added since the check are
+    # included rather than overwritten with a stale number. Like any
+    # other change to a list, it has to move updated_at and the cache
+    # version on, or cached pages and 304s would keep the wrong count.
+    repaired = 0
+    for lists in on_every_shard(List.objects.all()):
+        for start in range(0, len(list_ids), batch_size):
+            batch = list_ids[start:start + batch_size]
+            updated = lists.filter(pk__in=batch).update(
+                item_count=_counted(), updated_at=timezone.now()
+            )
+            if updated:
+                for list_id in batch:
+                    bump_list_cache_version(list_id, using=lists.db)
+            repaired += updated
+    return repaired
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 01:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0007_list_shared_with'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='name',
+            field=models.TextField(blank=True, db_index=True, default=''),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_list_names(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    Item = apps.get_model('lists', 'Item')
+    first_item_text = Item.objects.filter(
+        list=OuterRef('pk')
+    ).order_by('id').values('text')[:1]
+    List.objects.using(schema_editor.connection.alias).update(
+        name=Coalesce(Subquery(first_item_text), Value(''))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0008_list_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_list_names, migrations.RunPython.noop),
+    ]
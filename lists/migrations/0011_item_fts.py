@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The full-text search SQL is copied here rather than imported from
+# lists.search, so this migration keeps doing what it did when written.
+
+CREATE_FTS_SQL = [
+    """
+    CREATE VIRTUAL TABLE lists_item_fts USING fts5(
+        text, content='lists_item', content_rowid='id'
+    )
+    """,
+    "INSERT INTO lists_item_fts(lists_item_fts) VALUES ('rebuild')",
+]
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS lists_item_fts_insert',
+    'DROP TRIGGER IF EXISTS lists_item_fts_delete',
+    'DROP TRIGGER IF EXISTS lists_item_fts_update',
+]
+
+CREATE_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER lists_item_fts_insert AFTER INSERT ON lists_item BEGIN
+        INSERT INTO lists_item_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_delete AFTER DELETE ON lists_item BEGIN
+        INSERT INTO lists_item_fts(lists_item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_update AFTER UPDATE ON lists_item BEGIN
+        INSERT INTO lists_item_fts(lists_item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO lists_item_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+DROP_FTS_SQL = DROP_TRIGGERS_SQL + ['DROP TABLE IF EXISTS lists_item_fts']
+
+
+def create_item_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in CREATE_FTS_SQL + CREATE_TRIGGERS_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_item_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0010_list_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_item_fts, drop_item_fts),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import migrations
+
+
+def backfill_text_hashes(apps, schema_editor):
+    Item = apps.get_model('lists', 'Item')
+    items = Item.objects.using(schema_editor.connection.alias)
+    last_id = 0
+    while True:
+        chunk = list(
+            items.filter(id__gt=last_id).order_by('id').values_list(
+                'id', 'text'
+            )[:1000]
+        )
+        if not chunk:
+            return
+        for item_id, text in chunk:
+            items.filter(id=item_id).update(
+                text_hash=hashlib.sha256(text.encode('utf-8')).hexdigest()
+            )
+        last_id = chunk[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0012_item_text_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_text_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# The full-text search SQL is copied here rather than imported from
+# lists.search, so this migration keeps doing what it did when written.
+
+DROP_TRIGGERS_SQL = [
+    'DROP TRIGGER IF EXISTS lists_item_fts_insert',
+    'DROP TRIGGER IF EXISTS lists_item_fts_delete',
+    'DROP TRIGGER IF EXISTS lists_item_fts_update',
+]
+
+CREATE_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER lists_item_fts_insert AFTER INSERT ON lists_item BEGIN
+        INSERT INTO lists_item_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_delete AFTER DELETE ON lists_item BEGIN
+        INSERT INTO lists_item_fts(lists_item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_update AFTER UPDATE ON lists_item BEGIN
+        INSERT INTO lists_item_fts(lists_item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO lists_item_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    # Altering lists_item on SQLite rebuilds the table, which drops
+    # its triggers.
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in DROP_TRIGGERS_SQL + CREATE_TRIGGERS_SQL:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0013_backfill_item_text_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together=set([('list', 'text_hash')]),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+    ]
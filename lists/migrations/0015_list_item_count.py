@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-17 01:19
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0014_item_unique_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
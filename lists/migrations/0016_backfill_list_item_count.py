@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_counts(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    Item = apps.get_model('lists', 'Item')
+    item_count = Item.objects.filter(
+        list=OuterRef('pk')
+    ).order_by().values('list').annotate(count=Count('id')).values('count')
+    List.objects.using(schema_editor.connection.alias).update(
+        item_count=Coalesce(Subquery(item_count), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0015_list_item_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_item_counts, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,64 @@
+import hashlib
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from urllib.parse import urlencode
+
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import F, Max, Q
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from lists.sharding import (
+    allocate_list_ids, is_sharded, on_every_shard, shard_for_list
+)
+from superlists.routers import pin_to_primary
+from superlists.transactions import immediate_atomic
 
 # Create your models here.
 
+ITEM_ADDED = 'added'
+ITEM_DUPLICATE = 'duplicate'
+ITEM_EMPTY = 'empty'
+
+
+_deleting_lists = ContextVar('deleting_lists', default=False)
+
+
+@contextmanager
+def deleting_lists():
+    """Mark the block as deleting lists, so the items deleted along with
+    them don't each update a list that's about to go."""
+    token = _deleting_lists.set(True)
+    try:
+        yield
+    finally:
+        _deleting_lists.reset(token)
+
+
+class ListQuerySet(models.QuerySet):
+
+    def delete(self):
+        with deleting_lists():
+            return super().delete()
+
+
+class ListManager(models.Manager.from_queryset(ListQuerySet)):
+
+    def on_shard(self, list_id):
+        """Lists on the shard that holds `list_id`."""
+        if is_sharded():
+            return self.using(shard_for_list(list_id))
+        return self.all()
+
 
 class List(models.Model):
     owner = models.ForeignKey(
@@ -14,28 +69,558 @@ class List(models.Model):
     shared_with = models.ManyToManyField(
         settings.AUTH_USER_MODEL, related_name='shared_lists'
     )
+    # The text of the first item, kept in sync by the Item signal
+    # handlers below so listing pages never have to touch lists_item.
+    name = models.TextField(default='', blank=True, db_index=True)
+    # Bumped whenever the list, its items or its sharees change, so
+    # list pages can answer If-Modified-Since without looking further.
+    updated_at = models.DateTimeField(auto_now=True)
+    # Kept in step with lists_item by F() increments wherever items are
+    # added or removed; `manage.py verify_item_counts` checks it.
+    item_count = models.PositiveIntegerField(default=0)
+
+    objects = ListManager()
 
     def get_absolute_url(self):
         return reverse('view_list', args=[self.id])
 
-    @property
-    def name(self):
-        return self.item_set.first().text
+    def delete(self, *args, **kwargs):
+        with deleting_lists():
+            return super().delete(*args, **kwargs)
+
+    def save(self, *args, **kwargs):
+        if is_sharded():
+            if self.pk is None:
+                # The id picks the shard, so it has to be known up front.
+                self.pk = allocate_list_ids(1)[0]
+                kwargs['force_insert'] = True
+            # Managers pass their own database to save(), e.g. from
+            # create(), but the list can only go on its shard.
+            kwargs['using'] = shard_for_list(self.pk)
+        super().save(*args, **kwargs)
 
     @staticmethod
     def create_new(first_item_text, owner=None):
-        list_ = List.objects.create(owner=owner)
-        Item.objects.create(text=first_item_text, list=list_)
+        list_ = List(owner=owner, name=first_item_text)
+        if is_sharded():
+            list_.pk = allocate_list_ids(1)[0]
+        # The list and its first item go in together, in one write
+        # transaction on the list's own database.
+        using = router.db_for_write(List, instance=list_)
+        with immediate_atomic(using=using):
+            list_.save(force_insert=True)
+            Item.objects.create(text=first_item_text, list=list_)
         return list_
 
+    def add_items(self, texts):
+        """Add many items at once, skipping blanks and duplicates.
+
+        Returns a (text, status) pair for each of `texts`, in order,
+        where status is one of ITEM_ADDED, ITEM_EMPTY or ITEM_DUPLICATE.
+        """
+        texts = [text.strip() for text in texts]
+        using = router.db_for_write(List, instance=self)
+        with immediate_atomic(using=using):
+            # Matching on the hash uses the unique index; keeping the
+            # text of each match means a hash collision is never taken
+            # for a duplicate.
+            existing = set(
+                self.item_set.filter(
+                    text_hash__in={text_digest(text) for text in texts if text}
+                ).order_by().values_list('text', flat=True)
+            )
+            results = []
+            new_items = []
+            for text in texts:
+                if not text:
+                    results.append((text, ITEM_EMPTY))
+                elif text in existing:
+                    results.append((text, ITEM_DUPLICATE))
+                else:
+                    existing.add(text)
+                    new_items.append(Item(
+                        list=self, text=text, text_hash=text_digest(text)
+                    ))
+                    results.append((text, ITEM_ADDED))
+            if new_items:
+                # bulk_create skips the Item signal handlers, so do
+                # their bookkeeping here.
+                Item.objects.using(using).bulk_create(new_items)
+                lists = List.objects.using(using)
+                if not self.name:
+                    self.name = new_items[0].text
+                    lists.filter(pk=self.pk, name='').update(name=self.name)
+                bump_list_cache_version(self.id, using=using)
+                lists.filter(pk=self.pk).update(
+                    updated_at=timezone.now(),
+                    item_count=F('item_count') + len(new_items),
+                )
+                self.item_count += len(new_items)
+        return results
+
+    def share_with(self, emails):
+        """Share this list with all of `emails`, creating any users that
+        don't exist yet.
+
+        Missing users are found with one query and created with one
+        INSERT, and the sharing rows are added with one more, skipping
+        anyone the list is already shared with.
+        """
+        emails = list(dict.fromkeys(emails))
+        if not emails:
+            return
+        User = get_user_model()
+        with transaction.atomic():
+            existing = set(User.objects.filter(
+                email__in=emails
+            ).values_list('email', flat=True))
+            missing = [User(email=email) for email in emails
+                       if email not in existing]
+            if missing:
+                try:
+                    with transaction.atomic():
+                        User.objects.bulk_create(missing)
+                except IntegrityError:
+                    # Someone else created one of them in the meantime.
+                    for user in missing:
+                        User.objects.get_or_create(email=user.email)
+        # Users live on the default database, the sharing rows on the
+        # list's. The users are committed first, so the default
+        # database isn't held while the list's is written.
+        with immediate_atomic(
+            using=router.db_for_write(List, instance=self),
+            savepoint=False
+        ):
+            self.shared_with.add(*emails)
+
+    def item_chunks(self, chunk_size=None):
+        """Yield all of this list's items, in order, a chunk at a time.
+
+        Each chunk is fetched by seeking past the last id seen, so
+        memory use stays flat however long the list is.
+        """
+        chunk_size = chunk_size or settings.LIST_STREAM_CHUNK_SIZE
+        last_id = 0
+        while True:
+            chunk = list(self.item_set.filter(id__gt=last_id)[:chunk_size])
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_size:
+                return
+            last_id = chunk[-1].id
+
+    @staticmethod
+    def touch(list_id, using=None):
+        lists = List.objects.using(using) if using else List.objects.on_shard(
+            list_id
+        )
+        lists.filter(pk=list_id).update(updated_at=timezone.now())
+
+    @staticmethod
+    def last_modified_for_user(user):
+        """When `user`'s lists, or which lists they have, last changed.
+
+        The lists' own updated_at can't show a list going away, so the
+        time the set of lists last changed is counted too.
+        """
+        latest = [
+            lists.aggregate(Max('updated_at'))['updated_at__max']
+            for lists in on_every_shard(
+                List.objects.filter(Q(owner=user) | Q(shared_with=user))
+            )
+        ]
+        latest.append(get_user_lists_changed(getattr(user, 'pk', user)))
+        return max(when for when in latest if when)
+
+    @staticmethod
+    def _from_every_shard(queryset):
+        if not is_sharded():
+            return list(queryset)
+        return sorted(
+            (list_ for lists in on_every_shard(queryset) for list_ in lists),
+            key=lambda list_: list_.id
+        )
+
+    @staticmethod
+    def owned_by(user):
+        return List._from_every_shard(
+            List.objects.filter(owner=user).only('id', 'name', 'item_count')
+        )
+
+    @staticmethod
+    def shared_with_user(user):
+        # owner_id is the owner's email, so there's no need to join
+        # accounts_user just to display it.
+        return List._from_every_shard(
+            List.objects.filter(shared_with=user).only(
+                'id', 'name', 'owner', 'item_count'
+            )
+        )
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
 
 class Item(models.Model):
     text = models.TextField(default='')
     list = models.ForeignKey(List, default=None)
+    # A fixed-width stand-in for text in the uniqueness constraint, so
+    # the index doesn't grow with the length of the items. Anything
+    # that finds a duplicate through it compares the text as well.
+    text_hash = models.CharField(max_length=64, editable=False)
 
     class Meta:
         ordering = ('id',)
-        unique_together = ('list', 'text')
+        unique_together = ('list', 'text_hash')
 
     def __str__(self):
         return self.text
+
+    def validate_unique(self, exclude=None):
+        self.text_hash = text_digest(self.text)
+        super().validate_unique(exclude=exclude)
+
+    def save(self, *args, **kwargs):
+        self.text_hash = text_digest(self.text)
+        if is_sharded():
+            kwargs['using'] = shard_for_list(self.list_id)
+        super().save(*args, **kwargs)
+
+
+class IdSequence(models.Model):
+    """A named counter on the default database; see
+    lists.sharding.allocate_list_ids."""
+    name = models.CharField(max_length=50, primary_key=True)
+    value = models.BigIntegerField(default=0)
+
+
+def _list_version_key(list_id):
+    return f'lists:list:{list_id}:version'
+
+
+def _list_page_key(list_id, version, page_key):
+    return f'lists:list:{list_id}:{version}:page:{page_key}'
+
+
+def get_list_cache_version(list_id):
+    """Return the token that rendered fragments of a list are keyed on.
+
+    A missing token (never set, or evicted) is replaced with a fresh
+    one, so a cold cache can only ever cause a miss, never a stale hit.
+    """
+    key = _list_version_key(list_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_list_cache_version(list_id, using=None):
+    def bump():
+        cache.set(_list_version_key(list_id), uuid.uuid4().hex, None)
+    # Bump again once the change is committed, in case another request
+    # rendered and cached the old rows under the new token in between.
+    bump()
+    transaction.on_commit(bump, using=using)
+
+
+def _user_lists_key(email):
+    return f'lists:user:{email}:changed'
+
+
+def get_user_lists_changed(email):
+    """Return when lists were last shared with, unshared from or
+    deleted under `email`.
+
+    As with get_list_cache_version, a missing time is taken to be now,
+    so a cold cache can only make the lists look newer.
+    """
+    key = _user_lists_key(email)
+    changed = cache.get(key)
+    if changed is None:
+        cache.add(key, timezone.now(), None)
+        changed = cache.get(key)
+    return changed
+
+
+def bump_user_lists_changed(emails, using=None):
+    def bump():
+        now = timezone.now()
+        cache.set_many({_user_lists_key(email): now for email in emails}, None)
+    if emails:
+        bump()
+        transaction.on_commit(bump, using=using)
+
+
+class ItemPage(object):
+    """One page of a list's items, in Item.id order.
+
+    Pages are found by seeking past the id of the last (or before the
+    id of the first) item on the neighbouring page rather than with an
+    OFFSET, so page 500 costs the same as page 1. `number` is the
+    position of that boundary item, carried along in the links so rows
+    can be numbered without counting everything in front of them.
+    `found` is what fetch() returned for the same cursor, if it's been
+    read already.
+    """
+
+    def __init__(self, list_, after=None, before=None, number=None,
+                 size=None, found=None):
+        self.list = list_
+        self.size = size or settings.LIST_PAGE_SIZE
+        if found is None:
+            found = self.fetch(list_, after, before, self.size)
+        page_items, self.has_previous, self.has_next = found
+        items = list_.item_set.all()
+        if before is not None:
+            if number is None:
+                number = items.filter(id__lt=before).count() + 1
+            start = number - len(page_items)
+        else:
+            if after is not None and number is None:
+                number = items.filter(id__lte=after).count()
+            start = (number or 0) + 1
+        self.rows = list(enumerate(page_items, start=start))
+
+    @staticmethod
+    def fetch(list_, after, before, size):
+        """Return the page's items and whether there are pages before
+        and after it."""
+        items = list_.item_set.all()
+        if before is not None:
+            found = list(items.filter(id__lt=before).order_by('-id')[
+                :size + 1
+            ])
+            return found[:size][::-1], len(found) > size, True
+        query = items if after is None else items.filter(id__gt=after)
+        found = list(query[:size + 1])
+        return found[:size], after is not None, len(found) > size
+
+    def _query(self, **params):
+        if self.size != settings.LIST_PAGE_SIZE:
+            params['page_size'] = self.size
+        return '?' + urlencode(params)
+
+    @property
+    def previous_query(self):
+        if self.has_previous and self.rows:
+            number, item = self.rows[0]
+            return self._query(before=item.id, n=number)
+
+    @property
+    def next_query(self):
+        if self.has_next and self.rows:
+            number, item = self.rows[-1]
+            return self._query(after=item.id, n=number)
+
+
+class ListSnapshot(object):
+    """Everything list.html reads about a list.
+
+    Items and sharees are each fetched with a single query the first
+    time they're asked for, so rendering a list costs the same number
+    of queries however long it is.
+
+    The page of items and the sharees are cached under `version`, so
+    they're read from the primary: a replica that hasn't caught up
+    with the change that set the version would store the old rows
+    under it.
+    """
+
+    def __init__(self, list_, **page):
+        self.list = list_
+        self.page_params = page
+
+    @classmethod
+    def load(cls, list_id, **page):
+        return cls(List.objects.on_shard(list_id).get(id=list_id), **page)
+
+    @cached_property
+    def page(self):
+        # Only the items are cached, not their numbers: those come from
+        # the client's n, which must neither reach anyone else's page
+        # nor fill the cache with one copy of the page per value.
+        params = dict(self.page_params)
+        number = params.pop('number', None)
+        key = _list_page_key(self.list.id, self.version, self.page_key)
+        found = cache.get(key)
+        if found is None:
+            with pin_to_primary():
+                found = ItemPage.fetch(
+                    self.list,
+                    params.get('after'),
+                    params.get('before'),
+                    params.get('size') or settings.LIST_PAGE_SIZE,
+                )
+            cache.set(key, found, self.cache_timeout)
+        return ItemPage(self.list, number=number, found=found, **params)
+
+    @property
+    def page_key(self):
+        return urlencode(sorted(
+            (key, value) for key, value in self.page_params.items()
+            if value is not None and key != 'number'
+        ))
+
+    @property
+    def owner_email(self):
+        # The User primary key is the email, so no join is needed.
+        return self.list.owner_id
+
+    @cached_property
+    def version(self):
+        return get_list_cache_version(self.list.id)
+
+    @property
+    def cache_timeout(self):
+        return settings.LIST_FRAGMENT_CACHE_TIMEOUT
+
+    @cached_property
+    def items(self):
+        return list(self.list.item_set.all())
+
+    @cached_property
+    def sharee_emails(self):
+        primary = router.db_for_write(List, instance=self.list)
+        return list(
+            List.shared_with.through.objects.using(primary).filter(
+                list_id=self.list.id
+            ).order_by('id').values_list('user_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=Item)
+def sync_list_name_on_item_save(sender, instance, created, using, **kwargs):
+    if created and Item.list.is_cached(instance) and instance.list.name:
+        # A freshly added item can only be the first one if the list
+        # had no name yet, so skip the UPDATE for the common case.
+        return
+    updated = List.objects.using(using).filter(pk=instance.list_id).exclude(
+        item__id__lt=instance.id
+    ).update(name=instance.text)
+    if updated and Item.list.is_cached(instance):
+        instance.list.name = instance.text
+
+
+@receiver(post_delete, sender=Item)
+def sync_list_name_on_item_delete(sender, instance, using, **kwargs):
+    if _deleting_lists.get():
+        return
+    first_item = Item.objects.using(using).filter(
+        list_id=instance.list_id
+    ).first()
+    List.objects.using(using).filter(pk=instance.list_id).update(
+        name=first_item.text if first_item else ''
+    )
+
+
+@receiver(post_save, sender=List)
+@receiver(post_delete, sender=List)
+def bump_version_on_list_change(sender, instance, using, **kwargs):
+    bump_list_cache_version(instance.id, using=using)
+
+
+@receiver(pre_delete, sender=List)
+def bump_users_on_list_delete(sender, instance, using, **kwargs):
+    # The sharing rows are deleted along with the list without any
+    # m2m_changed or delete signals, so find the sharees beforehand.
+    emails = list(List.shared_with.through.objects.using(using).filter(
+        list_id=instance.id
+    ).values_list('user_id', flat=True))
+    if instance.owner_id:
+        emails.append(instance.owner_id)
+    bump_user_lists_changed(emails, using=using)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def bump_version_on_item_change(sender, instance, using, **kwargs):
+    if _deleting_lists.get():
+        return
+    bump_list_cache_version(instance.list_id, using=using)
+
+
+def _update_list_for_item(item, delta, using):
+    changes = {'updated_at': timezone.now()}
+    if delta:
+        changes['item_count'] = F('item_count') + delta
+    List.objects.using(using).filter(pk=item.list_id).update(**changes)
+    if delta and Item.list.is_cached(item):
+        item.list.item_count += delta
+
+
+@receiver(post_save, sender=Item)
+def touch_list_on_item_save(sender, instance, created, using, **kwargs):
+    _update_list_for_item(instance, 1 if created else 0, using)
+
+
+@receiver(post_delete, sender=Item)
+def touch_list_on_item_delete(sender, instance, using, **kwargs):
+    if _deleting_lists.get():
+        return
+    _update_list_for_item(instance, -1, using)
+
+
+@receiver(m2m_changed, sender=List.shared_with.through)
+def on_share_change(sender, instance, action, reverse, pk_set, using,
+                    **kwargs):
+    if not reverse:
+        if action == 'pre_clear':
+            instance._cleared_sharees = list(
+                sender.objects.using(using).filter(
+                    list_id=instance.id
+                ).values_list('user_id', flat=True)
+            )
+        elif action == 'post_clear':
+            pk_set = instance.__dict__.pop('_cleared_sharees', [])
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            bump_list_cache_version(instance.id, using=using)
+            bump_user_lists_changed(pk_set, using=using)
+            List.touch(instance.id, using=using)
+        return
+    # Changed from the user's side, e.g. user.shared_lists.add(list_).
+    if is_sharded():
+        _share_from_lists_side(instance, action, pk_set)
+        return
+    # A clear doesn't say which lists it touched, so note them first.
+    if action == 'pre_clear':
+        instance._cleared_list_ids = list(
+            instance.shared_lists.values_list('id', flat=True)
+        )
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_list_ids', [])
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_user_lists_changed([instance.pk], using=using)
+        for list_id in pk_set or ():
+            bump_list_cache_version(list_id, using=using)
+        if pk_set:
+            List.objects.using(using).filter(pk__in=pk_set).update(
+                updated_at=timezone.now()
+            )
+
+
+def _share_from_lists_side(user, action, pk_set):
+    """Redo a change to user.shared_lists from each list's side.
+
+    The user's side of the relation is routed by the user, who lives
+    on the default database, but the sharing rows live on each list's
+    shard. So make the change there, and empty pk_set so that Django
+    has nothing left to write to the default database.
+    """
+    if action in ('pre_add', 'pre_remove'):
+        for list_id in pk_set:
+            # Only the id is needed to route to the list's shard.
+            sharees = List(id=list_id).shared_with
+            if action == 'pre_add':
+                sharees.add(user)
+            else:
+                sharees.remove(user)
+        pk_set.clear()
+    elif action == 'pre_clear':
+        for rows in on_every_shard(List.shared_with.through.objects.all()):
+            for list_id in rows.filter(user_id=user.pk).values_list(
+                'list_id', flat=True
+            ):
+                List(id=list_id).shared_with.remove(user)
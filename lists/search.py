@@ -0,0 +1,97 @@
+"""Full-text search over list items.
+
+On SQLite, items are indexed in an FTS5 table, lists_item_fts, that
+uses lists_item as its external content. Triggers keep the index up
+to date for every insert, update and delete, including bulk_create
+and queryset updates that skip the model signals.
+
+The table and triggers are created by migration 0011. SQLite rebuilds
+lists_item for most alterations, which drops the triggers, so any
+migration that alters it has to create them again, as 0012 and 0014 do.
+"""
+from django.db import connection, connections
+from django.db.models import Q
+
+from lists.models import Item, List
+from lists.sharding import is_sharded, on_every_shard
+
+SEARCH_SQL = """
+    SELECT lists_item.id, lists_item.text, lists_item.list_id,
+           lists_list.name AS list_name, lists_item_fts.rank AS rank
+    FROM lists_item_fts
+    JOIN lists_item ON lists_item.id = lists_item_fts.rowid
+    JOIN lists_list ON lists_list.id = lists_item.list_id
+    WHERE lists_item_fts MATCH %s
+      AND (lists_list.owner_id = %s OR lists_list.id IN (
+          SELECT list_id FROM lists_list_shared_with WHERE user_id = %s
+      ))
+    ORDER BY lists_item_fts.rank, lists_item.id
+    LIMIT %s OFFSET %s
+"""
+
+
+def fts_enabled(using_connection=connection):
+    return using_connection.vendor == 'sqlite'
+
+
+def _match_expression(query):
+    # Quote every word so user input can't be read as FTS5 syntax; the
+    # quoted words are ANDed together.
+    return ' '.join(
+        '"%s"' % word.replace('"', '""') for word in query.split()
+    )
+
+
+class SearchPage(object):
+
+    def __init__(self, results, number, size):
+        self.number = number
+        self.has_next = len(results) > size
+        self.results = results[:size]
+        self.has_previous = number > 1
+
+
+def _search_shard(items, user, query, limit, offset):
+    if fts_enabled(connections[items.db]):
+        return list(items.raw(SEARCH_SQL, [
+            _match_expression(query), user.email, user.email, limit, offset
+        ]))
+    accessible_lists = List.objects.using(items.db).filter(
+        Q(owner=user) | Q(shared_with=user)
+    ).values('id')
+    results = list(items.filter(
+        text__icontains=query, list__in=accessible_lists
+    ).select_related('list')[offset:offset + limit])
+    for item in results:
+        item.list_name = item.list.name
+        item.rank = 0
+    return results
+
+
+def search_items(user, query, page=1, size=20):
+    """Rank the items in lists `user` owns or has been shared against
+    `query`, returning the requested page of results."""
+    page = max(page, 1)
+    if not query.split():
+        return SearchPage([], page, size)
+    offset = (page - 1) * size
+    if not is_sharded():
+        return SearchPage(
+            _search_shard(Item.objects.all(), user, query, size + 1, offset),
+            page, size
+        )
+    # Every shard could hold any of the top results, so each returns
+    # everything up to the end of the page and they're merged here.
+    # Each shard ranks against its own index, so the merged order is
+    # close to, but not exactly, what one big index would give.
+    results = sorted(
+        (
+            item
+            for items in on_every_shard(Item.objects.all())
+            for item in _search_shard(
+                items, user, query, offset + size + 1, 0
+            )
+        ),
+        key=lambda item: (item.rank, item.id)
+    )
+    return SearchPage(results[offset:offset + size + 1], page, size)
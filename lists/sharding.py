@@ -0,0 +1,103 @@
+"""Spreading lists over several databases.
+
+Each List lives, with its items and sharing rows, on one of the aliases
+in LIST_SHARDS, chosen by its id modulo the number of shards. Users,
+tokens and everything else stay on the default database. Changing the
+number of shards moves most lists, so existing rows must be copied
+across before it's done.
+
+With a single shard, none of this changes how queries are routed.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import F, Max
+
+from superlists.transactions import immediate_atomic
+
+SHARDED_MODELS = {'list', 'item', 'list_shared_with'}
+
+
+def is_sharded():
+    return len(settings.LIST_SHARDS) > 1
+
+
+def shard_for_list(list_id):
+    return settings.LIST_SHARDS[int(list_id) % len(settings.LIST_SHARDS)]
+
+
+def on_every_shard(queryset):
+    """Return `queryset` pointed at each shard in turn, or just as it is
+    if there's only one."""
+    if not is_sharded():
+        return [queryset]
+    return [queryset.using(alias) for alias in settings.LIST_SHARDS]
+
+
+def allocate_list_ids(count):
+    """Reserve `count` consecutive list ids that no shard will reuse.
+
+    The shards can't share an autoincrement, so ids come from a counter
+    on the default database, seeded from the highest id on any shard
+    the first time it's needed.
+    """
+    from lists.models import IdSequence, List
+    sequences = IdSequence.objects.using(DEFAULT_DB_ALIAS)
+    with immediate_atomic(using=DEFAULT_DB_ALIAS):
+        if not sequences.filter(name='list').update(
+            value=F('value') + count
+        ):
+            highest = max(
+                List.objects.using(alias).aggregate(Max('id'))['id__max'] or 0
+                for alias in settings.LIST_SHARDS
+            )
+            sequences.create(name='list', value=highest + count)
+        last = sequences.get(name='list').value
+    return range(last - count + 1, last + 1)
+
+
+def _is_sharded_model(model):
+    # Takes a model or an instance, including a lazy one such as
+    # request.user, whose type() isn't the model.
+    return (
+        model._meta.app_label == 'lists'
+        and model._meta.model_name in SHARDED_MODELS
+    )
+
+
+class ListShardRouter(object):
+    """Send List, Item and sharing queries to their list's shard.
+
+    The shard can only be worked out from an instance hint, which
+    Django gives for saves and related managers (list_.item_set and so
+    on). Other queries have to pick their shard with
+    List.objects.on_shard() or on_every_shard().
+
+    A user's side of the sharing relation (user.shared_lists) only has
+    the user to go on, so changes made there are redone from each
+    list's side by the m2m_changed receiver in lists.models.
+    """
+
+    def _db_for(self, model, instance=None, **hints):
+        if not is_sharded() or not _is_sharded_model(model):
+            return None
+        if instance is None or not _is_sharded_model(instance):
+            return None
+        if instance._state.db:
+            return instance._state.db
+        if instance._meta.model_name == 'list':
+            list_id = instance.pk
+        else:
+            list_id = getattr(instance, 'list_id', None)
+        if list_id is not None:
+            return shard_for_list(list_id)
+        return None
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Lists point at users on the default database; nothing checks
+        # that relation in SQL, so it can cross databases.
+        if _is_sharded_model(obj1) or _is_sharded_model(obj2):
+            return True
+        return None
@@ -0,0 +1,194 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from lists.api import INVALID_BODY_ERROR, INVALID_SHAREE_TYPE_ERROR
+from lists.forms import DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR
+from lists.models import Item, List
+
+User = get_user_model()
+
+
+class ListAPITest(TestCase):
+
+    def test_returns_list_with_items_owner_and_sharees(self):
+        owner = User.objects.create(email='owner@example.com')
+        User.objects.create(email='friend@example.com')
+        list_ = List.create_new(first_item_text='item 1', owner=owner)
+        Item.objects.create(list=list_, text='item 2')
+        list_.shared_with.add('friend@example.com')
+        response = self.client.get(f'/api/lists/{list_.id}/')
+        items = list_.item_set.all()
+        self.assertEqual(response.json(), {
+            'id': list_.id,
+            'url': f'/lists/{list_.id}/',
+            'name': 'item 1',
+            'owner': 'owner@example.com',
+            'item_count': 2,
+            'items': [
+                {'id': items[0].id, 'text': 'item 1'},
+                {'id': items[1].id, 'text': 'item 2'},
+            ],
+            'shared_with': ['friend@example.com'],
+        })
+
+    def test_404s_for_missing_list(self):
+        response = self.client.get('/api/lists/999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_sends_strong_etag(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/api/lists/{list_.id}/')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_matching_if_none_match_gets_304_without_queries(self):
+        list_ = List.create_new(first_item_text='item 1')
+        etag = self.client.get(f'/api/lists/{list_.id}/')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                f'/api/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_when_list_changes(self):
+        list_ = List.create_new(first_item_text='item 1')
+        etag = self.client.get(f'/api/lists/{list_.id}/')['ETag']
+        Item.objects.create(list=list_, text='item 2')
+        response = self.client.get(
+            f'/api/lists/{list_.id}/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class NewListAPITest(TestCase):
+
+    def test_creates_list_from_json(self):
+        response = self.client.post(
+            '/api/lists/new',
+            json.dumps({'text': 'first item'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        list_ = List.objects.get()
+        self.assertEqual(response.json()['id'], list_.id)
+        self.assertEqual(list_.name, 'first item')
+
+    def test_saves_owner_if_logged_in(self):
+        user = User.objects.create(email='a@b.com')
+        self.client.force_login(user)
+        self.client.post('/api/lists/new', {'text': 'first item'})
+        self.assertEqual(List.objects.get().owner, user)
+
+    def test_rejects_empty_item(self):
+        response = self.client.post('/api/lists/new', {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'errors': {'text': [EMPTY_ITEM_ERROR]}})
+        self.assertEqual(List.objects.count(), 0)
+
+    def test_rejects_json_body_that_is_not_an_object(self):
+        for body in (['first item'], 'first item', 1, None):
+            response = self.client.post(
+                '/api/lists/new', json.dumps(body),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(
+                response.json(), {'errors': {'__all__': [INVALID_BODY_ERROR]}}
+            )
+        self.assertEqual(List.objects.count(), 0)
+
+
+class AddItemAPITest(TestCase):
+
+    def test_adds_item(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/items',
+            json.dumps({'text': 'item 2'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['text'], 'item 2')
+        self.assertEqual(list_.item_set.count(), 2)
+
+    def test_rejects_duplicate_item(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/items', {'text': 'item 1'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.json(), {'errors': {'text': [DUPLICATE_ITEM_ERROR]}}
+        )
+
+    def test_rejects_json_body_that_is_not_an_object(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/items', json.dumps(['item 2']),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list_.item_set.count(), 1)
+
+
+class ShareListAPITest(TestCase):
+
+    def test_shares_list(self):
+        sharee = User.objects.create(email='friend@example.com')
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/share', {'sharee': 'friend@example.com'}
+        )
+        self.assertIn(sharee, list_.shared_with.all())
+        self.assertEqual(response.json()['shared_with'], ['friend@example.com'])
+
+    def test_requires_sharee(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(f'/api/lists/{list_.id}/share', {})
+        self.assertEqual(response.status_code, 400)
+
+    def test_shares_with_list_of_emails_from_json(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/share',
+            json.dumps({'sharee': ['a@example.com', 'b@example.com']}),
+            content_type='application/json'
+        )
+        # shared_with.add inserts the new rows in set order.
+        self.assertEqual(
+            sorted(response.json()['shared_with']),
+            ['a@example.com', 'b@example.com']
+        )
+
+    def test_rejects_invalid_emails_without_sharing(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/share',
+            {'sharee': 'a@example.com, nope'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list_.shared_with.count(), 0)
+
+    def test_rejects_json_body_that_is_not_an_object(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.post(
+            f'/api/lists/{list_.id}/share', json.dumps(['a@example.com']),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list_.shared_with.count(), 0)
+
+    def test_rejects_sharees_that_are_not_strings(self):
+        list_ = List.create_new(first_item_text='item 1')
+        for sharee in ([1], ['a@example.com', None], {'a': 'b'}, 5):
+            response = self.client.post(
+                f'/api/lists/{list_.id}/share', json.dumps({'sharee': sharee}),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'errors': {'sharee': [
+                INVALID_SHAREE_TYPE_ERROR
+            ]}})
+        self.assertEqual(list_.shared_with.count(), 0)
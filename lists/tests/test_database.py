@@ -0,0 +1,80 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.test import SimpleTestCase, TestCase
+
+from superlists.backends.sqlite3.base import DatabaseWrapper
+
+SQLITE_PRAGMAS = settings.SQLITE_PRAGMAS
+
+
+def pragma(conn, name):
+    return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+
+class SQLitePragmaTest(TestCase):
+
+    def test_pragmas_applied_to_test_connection(self):
+        connection.ensure_connection()
+        conn = connection.connection
+        self.assertEqual(
+            pragma(conn, 'busy_timeout'), SQLITE_PRAGMAS['busy_timeout']
+        )
+        self.assertEqual(
+            pragma(conn, 'cache_size'), SQLITE_PRAGMAS['cache_size']
+        )
+        self.assertEqual(pragma(conn, 'temp_store'), 2)  # MEMORY
+
+
+class SQLiteFilePragmaTest(SimpleTestCase):
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.wrapper = DatabaseWrapper({
+            **settings.DATABASES['default'],
+            'NAME': os.path.join(tmpdir.name, 'db.sqlite3'),
+        }, alias='pragma_test')
+        self.addCleanup(self.wrapper.close)
+
+    def test_file_database_uses_wal_and_normal_sync(self):
+        self.wrapper.ensure_connection()
+        conn = self.wrapper.connection
+        self.assertEqual(pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(pragma(conn, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(pragma(conn, 'mmap_size'), SQLITE_PRAGMAS['mmap_size'])
+
+    def test_persistent_connections_are_configured(self):
+        self.assertGreater(settings.DATABASES['default']['CONN_MAX_AGE'], 0)
+        self.assertTrue(settings.DATABASES['default']['CONN_HEALTH_CHECKS'])
+
+    def break_connection(self):
+        self.wrapper.ensure_connection()
+        self.wrapper.connection.close()
+        # As at the end of a request.
+        self.wrapper.close_if_unusable_or_obsolete()
+
+    def test_broken_connection_is_replaced_before_reuse(self):
+        self.break_connection()
+        with self.wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_health_check_runs_once_per_request(self):
+        self.wrapper.ensure_connection()
+        self.wrapper.close_if_unusable_or_obsolete()
+        with patch.object(
+            self.wrapper, 'is_usable', wraps=self.wrapper.is_usable
+        ) as is_usable:
+            for _ in range(3):
+                self.wrapper.cursor().execute('SELECT 1')
+        self.assertEqual(is_usable.call_count, 1)
+
+    def test_no_health_check_unless_enabled(self):
+        self.wrapper.settings_dict['CONN_HEALTH_CHECKS'] = False
+        self.break_connection()
+        with self.assertRaises(DatabaseError):
+            self.wrapper.cursor().execute('SELECT 1')
@@ -1,4 +1,5 @@
 import unittest
+from django.db import IntegrityError
 from django.test import TestCase
 from unittest.mock import patch, Mock
 
@@ -72,12 +73,42 @@ class ExistingListItemFormTest(TestCase):
         self.assertFalse(form.is_valid())
         self.assertEqual(form.errors['text'], [EMPTY_ITEM_ERROR])
 
-    def test_form_validation_for_duplicate_items(self):
+    def test_form_save_reports_duplicate_items(self):
         list_ = List.objects.create()
         Item.objects.create(list=list_, text='no twins!')
         form = ExistingListItemForm(for_list=list_, data={'text': 'no twins!'})
-        self.assertFalse(form.is_valid())
+        self.assertTrue(form.is_valid())
+        self.assertIsNone(form.save())
         self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+        self.assertEqual(Item.objects.count(), 1)
+
+    def test_duplicate_check_does_not_run_a_SELECT(self):
+        list_ = List.objects.create()
+        form = ExistingListItemForm(for_list=list_, data={'text': 'hi'})
+        with self.assertNumQueries(0):
+            form.is_valid()
+
+    @patch('lists.models.text_digest', return_value='0' * 64)
+    def test_form_save_does_not_mistake_hash_collision_for_duplicate(
+        self, mock_text_digest
+    ):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text='one text')
+        form = ExistingListItemForm(for_list=list_, data={'text': 'another'})
+        form.is_valid()
+        with self.assertRaises(IntegrityError):
+            form.save()
+
+    @patch('lists.forms.ItemForm.save')
+    def test_form_save_reraises_integrity_errors_for_non_duplicates(
+        self, mock_save
+    ):
+        mock_save.side_effect = IntegrityError
+        list_ = List.objects.create()
+        form = ExistingListItemForm(for_list=list_, data={'text': 'hi'})
+        form.is_valid()
+        with self.assertRaises(IntegrityError):
+            form.save()
 
     def test_form_save(self):
         list_ = List.objects.create()
@@ -0,0 +1,124 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from lists.models import Item, List, get_list_cache_version
+
+User = get_user_model()
+
+
+class LoadListsCommandTest(TestCase):
+
+    def load(self, *records, **options):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.ndjson', delete=False
+        ) as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+        self.addCleanup(os.remove, f.name)
+        stdout = StringIO()
+        call_command('load_lists', f.name, stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_loads_lists_and_items_in_order(self):
+        self.load(
+            {'items': ['a1', 'a2']},
+            {'items': ['b1']},
+        )
+        first, second = List.objects.order_by('id')
+        self.assertEqual(
+            [item.text for item in first.item_set.all()], ['a1', 'a2']
+        )
+        self.assertEqual(
+            [item.text for item in second.item_set.all()], ['b1']
+        )
+        self.assertEqual((first.name, second.name), ('a1', 'b1'))
+        self.assertEqual((first.item_count, second.item_count), (2, 1))
+
+    def test_creates_missing_owners_and_reuses_existing_ones(self):
+        existing = User.objects.create(email='old@example.com')
+        self.load(
+            {'owner': 'old@example.com', 'items': ['a']},
+            {'owner': 'new@example.com', 'items': ['b']},
+        )
+        self.assertEqual(List.objects.get(name='a').owner, existing)
+        self.assertTrue(User.objects.filter(email='new@example.com').exists())
+
+    def test_drops_duplicate_and_blank_items(self):
+        self.load({'items': ['a', ' a ', '', 'b', 'a']})
+        self.assertEqual(
+            [item.text for item in Item.objects.all()], ['a', 'b']
+        )
+
+    def test_batches_dont_reuse_list_ids(self):
+        List.create_new(first_item_text='already here')
+        self.load(
+            *[{'items': [f'list {i}']} for i in range(5)],
+            batch_size=2
+        )
+        self.assertEqual(List.objects.count(), 6)
+        self.assertEqual(Item.objects.count(), 6)
+        List.create_new(first_item_text='added afterwards')  # should not raise
+
+    def test_reports_rows_per_second(self):
+        output = self.load({'items': ['a', 'b']})
+        self.assertIn('Loaded 1 lists and 2 items', output)
+        self.assertIn('rows/sec', output)
+
+    def test_rejects_malformed_lines(self):
+        with self.assertRaises(CommandError):
+            self.load({'not items': []})
+
+    def test_rejects_items_that_are_not_a_list_of_strings(self):
+        for record in (
+            {'items': 'buy milk'},
+            {'items': ['buy milk', 2]},
+            {'items': {'buy': 'milk'}},
+            {'items': ['buy milk'], 'owner': ['a@b.com']},
+        ):
+            with self.assertRaises(CommandError):
+                self.load(record)
+        self.assertEqual(List.objects.count(), 0)
+
+
+class VerifyItemCountsCommandTest(TestCase):
+
+    def verify(self, *args):
+        stdout = StringIO()
+        call_command('verify_item_counts', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_reports_correct_counts(self):
+        List.create_new(first_item_text='first')
+        self.assertIn('All item counts are correct', self.verify())
+
+    def test_reports_drift_without_repairing(self):
+        list_ = List.create_new(first_item_text='first')
+        List.objects.filter(id=list_.id).update(item_count=7)
+        output = self.verify('--batch-size', '1')
+        self.assertIn(f'List {list_.id}: item_count is 7, counted 1', output)
+        self.assertEqual(List.objects.get(id=list_.id).item_count, 7)
+
+    def test_repairs_drift(self):
+        list_ = List.create_new(first_item_text='first')
+        empty = List.objects.create()
+        List.objects.filter(id=list_.id).update(item_count=0)
+        List.objects.filter(id=empty.id).update(item_count=3)
+        self.assertIn('Repaired 2 lists', self.verify('--repair'))
+        self.assertEqual(List.objects.get(id=list_.id).item_count, 1)
+        self.assertEqual(List.objects.get(id=empty.id).item_count, 0)
+
+    def test_repair_invalidates_cached_copies(self):
+        list_ = List.create_new(first_item_text='first')
+        List.objects.filter(id=list_.id).update(item_count=7)
+        before = List.objects.get(id=list_.id).updated_at
+        version = get_list_cache_version(list_.id)
+        self.verify('--repair')
+        self.assertNotEqual(get_list_cache_version(list_.id), version)
+        self.assertGreater(List.objects.get(id=list_.id).updated_at, before)
@@ -66,7 +66,11 @@ from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-from lists.models import Item, List
+from lists.models import (
+    ITEM_ADDED, ITEM_DUPLICATE, ITEM_EMPTY, Item, ItemPage, List,
+    ListSnapshot,
+    bump_list_cache_version, get_list_cache_version, text_digest
+)
 
 User = get_user_model()
 
@@ -115,6 +119,21 @@ class ItemModelTest(TestCase):
             [item1, item2, item3]
         )
 
+    def test_saving_sets_fixed_width_text_hash(self):
+        list_ = List.objects.create()
+        item = Item.objects.create(list=list_, text='a' * 10000)
+        self.assertEqual(len(item.text_hash), 64)
+        self.assertEqual(item.text_hash, text_digest('a' * 10000))
+
+    def test_text_hash_follows_text_edits(self):
+        list_ = List.objects.create()
+        item = Item.objects.create(list=list_, text='before')
+        item.text = 'after'
+        item.save()
+        self.assertEqual(
+            Item.objects.get(id=item.id).text_hash, text_digest('after')
+        )
+
     def test_string_representation(self):
         item = Item(text='some text')
         self.assertEqual(str(item), 'some text')
@@ -131,12 +150,40 @@ class ListModelTest(TestCase):
         Item.objects.create(list=list_, text='second item')
         self.assertEqual(list_.name, 'first item')
 
+    def test_list_name_is_persisted(self):
+        list_ = List.objects.create()
+        Item.objects.create(list=list_, text='first item')
+        Item.objects.create(list=list_, text='second item')
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first item')
+
+    def test_list_name_follows_edits_to_first_item(self):
+        list_ = List.create_new(first_item_text='first item')
+        Item.objects.create(list=list_, text='second item')
+        first_item = Item.objects.first()
+        first_item.text = 'edited'
+        first_item.save()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'edited')
+
+    def test_list_name_moves_to_next_item_when_first_is_deleted(self):
+        list_ = List.create_new(first_item_text='first item')
+        Item.objects.create(list=list_, text='second item')
+        Item.objects.first().delete()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'second item')
+
+    def test_editing_later_items_leaves_name_alone(self):
+        list_ = List.create_new(first_item_text='first item')
+        second_item = Item.objects.create(list=list_, text='second item')
+        second_item.text = 'edited'
+        second_item.save()
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first item')
+
     def test_create_new_creates_list_and_first_item(self):
         List.create_new(first_item_text='new item text')
         new_item = Item.objects.first()
         self.assertEqual(new_item.text, 'new item text')
         new_list = List.objects.first()
         self.assertEqual(new_item.list, new_list)
+        self.assertEqual(new_list.name, 'new item text')
 
     def test_create_new_optionally_saves_owner(self):
         user = User.objects.create()
@@ -161,6 +208,251 @@ class ListModelTest(TestCase):
     def test_lists_owner_is_optional(self):
         List().full_clean()  # should not raise
 
+    def test_item_chunks_yields_all_items_in_order(self):
+        list_ = List.objects.create()
+        list_.add_items([f'item {i}' for i in range(7)])
+        chunks = list(list_.item_chunks(chunk_size=3))
+        self.assertEqual([len(chunk) for chunk in chunks], [3, 3, 1])
+        self.assertEqual(
+            [item.text for chunk in chunks for item in chunk],
+            [f'item {i}' for i in range(7)]
+        )
+
+    def test_item_chunks_of_empty_list(self):
+        list_ = List.objects.create()
+        self.assertEqual(list(list_.item_chunks(chunk_size=3)), [])
+
+    def test_add_items_saves_new_items_in_order(self):
+        list_ = List.create_new(first_item_text='first')
+        list_.add_items(['second', 'third'])
+        self.assertEqual(
+            [item.text for item in list_.item_set.all()],
+            ['first', 'second', 'third']
+        )
+
+    def test_add_items_reports_duplicates_within_list_and_batch(self):
+        list_ = List.create_new(first_item_text='first')
+        results = list_.add_items(['first', 'new', 'new', ' ', 'other'])
+        self.assertEqual(results, [
+            ('first', ITEM_DUPLICATE),
+            ('new', ITEM_ADDED),
+            ('new', ITEM_DUPLICATE),
+            ('', ITEM_EMPTY),
+            ('other', ITEM_ADDED),
+        ])
+        self.assertEqual(list_.item_set.count(), 3)
+
+    def test_add_items_names_an_empty_list(self):
+        list_ = List.objects.create()
+        list_.add_items(['first', 'second'])
+        self.assertEqual(List.objects.get(id=list_.id).name, 'first')
+
+    def test_add_items_bumps_cache_version(self):
+        list_ = List.objects.create()
+        version = get_list_cache_version(list_.id)
+        list_.add_items(['first'])
+        self.assertNotEqual(get_list_cache_version(list_.id), version)
+
+    def test_item_count_follows_item_saves_and_deletes(self):
+        list_ = List.create_new(first_item_text='first')
+        self.assertEqual(list_.item_count, 1)
+        item = Item.objects.create(list=list_, text='second')
+        item.text = 'edited'
+        item.save()
+        self.assertEqual(List.objects.get(id=list_.id).item_count, 2)
+        item.delete()
+        self.assertEqual(List.objects.get(id=list_.id).item_count, 1)
+
+    def test_deleting_a_list_doesnt_update_it_per_item(self):
+        list_ = List.create_new(first_item_text='first')
+        list_.add_items([f'item {n}' for n in range(50)])
+        other = List.create_new(first_item_text='other')
+        with self.assertNumQueries(5):
+            list_.delete()
+        with self.assertNumQueries(6):
+            List.objects.filter(id=other.id).delete()
+        self.assertFalse(Item.objects.exists())
+        item = Item.objects.create(list=List.objects.create(), text='after')
+        item.delete()
+        self.assertEqual(List.objects.get(id=item.list_id).name, '')
+
+    def test_add_items_counts_new_items_only(self):
+        list_ = List.create_new(first_item_text='first')
+        list_.add_items(['first', 'second', 'third', ''])
+        self.assertEqual(list_.item_count, 3)
+        self.assertEqual(List.objects.get(id=list_.id).item_count, 3)
+
+    def test_share_with_creates_missing_users(self):
+        User.objects.create(email='a@example.com')
+        list_ = List.objects.create()
+        list_.share_with(['a@example.com', 'b@example.com'])
+        self.assertTrue(User.objects.filter(email='b@example.com').exists())
+        self.assertEqual(
+            sorted(user.email for user in list_.shared_with.all()),
+            ['a@example.com', 'b@example.com']
+        )
+
+    def test_share_with_is_idempotent(self):
+        list_ = List.objects.create()
+        list_.share_with(['a@example.com', 'a@example.com'])
+        list_.share_with(['a@example.com', 'b@example.com'])
+        self.assertEqual(list_.shared_with.count(), 2)
+
+    def test_share_with_queries_do_not_grow_with_emails(self):
+        list_ = List.objects.create()
+        # SAVEPOINT, SELECT users, SAVEPOINT, INSERT users, RELEASE,
+        # SELECT shares, INSERT shares, UPDATE updated_at, RELEASE
+        with self.assertNumQueries(9):
+            list_.share_with([f'user{i}@example.com' for i in range(50)])
+        self.assertEqual(list_.shared_with.count(), 50)
+
+    def test_add_items_uses_one_select_and_one_insert(self):
+        list_ = List.create_new(first_item_text='first')
+        # SAVEPOINT, SELECT, INSERT, UPDATE updated_at, RELEASE SAVEPOINT
+        with self.assertNumQueries(5):
+            list_.add_items([f'item {i}' for i in range(50)])
+
+
+class ListSnapshotTest(TestCase):
+
+    def test_load_fetches_list_by_id(self):
+        List.objects.create()
+        list_ = List.objects.create()
+        self.assertEqual(ListSnapshot.load(list_.id).list, list_)
+
+    def test_items_are_the_lists_items_in_order(self):
+        list_ = List.create_new(first_item_text='one')
+        Item.objects.create(list=list_, text='two')
+        snapshot = ListSnapshot.load(list_.id)
+        self.assertEqual(
+            [item.text for item in snapshot.items],
+            ['one', 'two']
+        )
+
+    def test_owner_email_and_sharee_emails(self):
+        owner = User.objects.create(email='owner@example.com')
+        User.objects.create(email='a@example.com')
+        list_ = List.create_new(first_item_text='one', owner=owner)
+        list_.shared_with.add('a@example.com')
+        snapshot = ListSnapshot.load(list_.id)
+        self.assertEqual(snapshot.owner_email, 'owner@example.com')
+        self.assertEqual(snapshot.sharee_emails, ['a@example.com'])
+
+    def test_loading_everything_takes_three_queries(self):
+        list_ = List.create_new(first_item_text='one')
+        for i in range(10):
+            Item.objects.create(list=list_, text=f'item {i}')
+        with self.assertNumQueries(3):
+            snapshot = ListSnapshot.load(list_.id)
+            snapshot.owner_email
+            snapshot.items
+            snapshot.sharee_emails
+            snapshot.items
+
+
+    def test_page_is_cached_without_the_row_number_from_the_url(self):
+        list_ = List.create_new(first_item_text='item 1')
+        list_.add_items(['item 2', 'item 3'])
+        after = list_.item_set.first().id
+        made_up = ListSnapshot.load(list_.id, after=after, number=40)
+        self.assertEqual(made_up.page.rows[0][0], 41)
+        snapshot = ListSnapshot.load(list_.id, after=after, number=1)
+        self.assertEqual(snapshot.page_key, made_up.page_key)
+        with self.assertNumQueries(0):
+            rows = snapshot.page.rows
+        self.assertEqual(
+            [(number, item.text) for number, item in rows],
+            [(2, 'item 2'), (3, 'item 3')]
+        )
+
+
+class ItemPageTest(TestCase):
+
+    def setUp(self):
+        self.list_ = List.objects.create()
+        self.list_.add_items([f'item {i}' for i in range(1, 8)])
+        self.ids = list(self.list_.item_set.values_list('id', flat=True))
+
+    def texts(self, page):
+        return [(number, item.text) for number, item in page.rows]
+
+    def test_first_page(self):
+        page = ItemPage(self.list_, size=3)
+        self.assertEqual(
+            self.texts(page),
+            [(1, 'item 1'), (2, 'item 2'), (3, 'item 3')]
+        )
+        self.assertIsNone(page.previous_query)
+        self.assertEqual(
+            page.next_query, f'?after={self.ids[2]}&n=3&page_size=3'
+        )
+
+    def test_page_after_cursor_is_numbered_from_it(self):
+        page = ItemPage(self.list_, after=self.ids[2], number=3, size=3)
+        self.assertEqual(
+            self.texts(page),
+            [(4, 'item 4'), (5, 'item 5'), (6, 'item 6')]
+        )
+        self.assertEqual(
+            page.previous_query, f'?before={self.ids[3]}&n=4&page_size=3'
+        )
+        self.assertIsNotNone(page.next_query)
+
+    def test_last_page_has_no_next(self):
+        page = ItemPage(self.list_, after=self.ids[5], number=6, size=3)
+        self.assertEqual(self.texts(page), [(7, 'item 7')])
+        self.assertIsNone(page.next_query)
+
+    def test_page_before_cursor(self):
+        page = ItemPage(self.list_, before=self.ids[3], number=4, size=2)
+        self.assertEqual(self.texts(page), [(2, 'item 2'), (3, 'item 3')])
+        self.assertIsNotNone(page.previous_query)
+        self.assertIsNotNone(page.next_query)
+
+    def test_numbers_rows_when_cursor_comes_without_a_number(self):
+        page = ItemPage(self.list_, after=self.ids[1], size=2)
+        self.assertEqual(self.texts(page), [(3, 'item 3'), (4, 'item 4')])
+
+    def test_deep_pages_take_a_single_query(self):
+        with self.assertNumQueries(1):
+            ItemPage(self.list_, after=self.ids[5], number=6, size=3)
+
+
+class ListCacheVersionTest(TestCase):
+
+    def test_version_is_stable_until_bumped(self):
+        list_ = List.objects.create()
+        version = get_list_cache_version(list_.id)
+        self.assertEqual(get_list_cache_version(list_.id), version)
+        bump_list_cache_version(list_.id)
+        self.assertNotEqual(get_list_cache_version(list_.id), version)
+
+    def test_saving_an_item_bumps_version(self):
+        list_ = List.objects.create()
+        version = get_list_cache_version(list_.id)
+        Item.objects.create(list=list_, text='new')
+        self.assertNotEqual(get_list_cache_version(list_.id), version)
+
+    def test_deleting_an_item_bumps_version(self):
+        list_ = List.objects.create()
+        item = Item.objects.create(list=list_, text='new')
+        version = get_list_cache_version(list_.id)
+        item.delete()
+        self.assertNotEqual(get_list_cache_version(list_.id), version)
+
+    def test_changing_sharees_from_either_side_bumps_version(self):
+        list_ = List.objects.create()
+        user = User.objects.create(email='a@b.com')
+        for change in (
+            lambda: list_.shared_with.add(user),
+            lambda: list_.shared_with.remove(user),
+            lambda: user.shared_lists.add(list_),
+            lambda: user.shared_lists.clear(),
+        ):
+            version = get_list_cache_version(list_.id)
+            change()
+            self.assertNotEqual(get_list_cache_version(list_.id), version)
+
 
 #                Useful Commands and Concepts
 # Running the Django dev server
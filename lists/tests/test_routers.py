@@ -0,0 +1,143 @@
+from unittest import skipUnless
+from unittest.mock import Mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+)
+
+from lists.models import Item, List
+from accounts.authentication import user_cache
+from accounts.models import Token
+from superlists.routers import (
+    PrimaryReplicaRouter, ReadYourWritesMiddleware, note_write,
+    pin_to_primary
+)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class PrimaryReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replicas(self):
+        reads = {self.router.db_for_read(List) for _ in range(50)}
+        self.assertEqual(reads, {'replica1', 'replica2'})
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(self.router.db_for_write(List), 'default')
+
+    def test_pinned_reads_go_to_primary(self):
+        with pin_to_primary():
+            self.assertEqual(self.router.db_for_read(List), 'default')
+        self.assertNotEqual(self.router.db_for_read(List), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_reads_go_to_primary_without_replicas(self):
+        self.assertEqual(self.router.db_for_read(List), 'default')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReadYourWritesMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.reads = []
+
+        def view(request):
+            self.reads.append(PrimaryReplicaRouter().db_for_read(List))
+            return HttpResponse()
+        self.middleware = ReadYourWritesMiddleware(view)
+
+    def test_post_reads_from_primary_and_sets_cookie(self):
+        response = self.middleware(self.factory.post('/lists/new'))
+        self.assertEqual(self.reads, ['default'])
+        cookie = response.cookies[settings.READ_YOUR_WRITES_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.READ_YOUR_WRITES_SECONDS)
+
+    def test_get_with_cookie_reads_from_primary(self):
+        request = self.factory.get('/lists/1/')
+        request.COOKIES[settings.READ_YOUR_WRITES_COOKIE] = '1'
+        response = self.middleware(request)
+        self.assertEqual(self.reads, ['default'])
+        self.assertNotIn(settings.READ_YOUR_WRITES_COOKIE, response.cookies)
+
+    def test_plain_get_reads_from_replica(self):
+        response = self.middleware(self.factory.get('/lists/1/'))
+        self.assertEqual(self.reads, ['replica1'])
+        self.assertNotIn(settings.READ_YOUR_WRITES_COOKIE, response.cookies)
+
+    def test_get_that_notes_a_write_sets_cookie(self):
+        def view(request):
+            note_write(request)
+            return HttpResponse()
+        response = ReadYourWritesMiddleware(view)(
+            self.factory.get('/accounts/login')
+        )
+        self.assertIn(settings.READ_YOUR_WRITES_COOKIE, response.cookies)
+
+    def test_get_that_changes_the_session_sets_cookie(self):
+        def view(request):
+            request.session = Mock(modified=True)
+            return HttpResponse()
+        response = ReadYourWritesMiddleware(view)(self.factory.get('/'))
+        self.assertIn(settings.READ_YOUR_WRITES_COOKIE, response.cookies)
+
+
+@skipUnless(
+    settings.DATABASE_REPLICAS,
+    'set DJANGO_DB_REPLICAS to one or more SQLite files to run'
+)
+class SeparateReplicaTest(TransactionTestCase):
+    """Against a replica that never catches up, e.g.
+    DJANGO_DB_REPLICAS=/tmp/replica.sqlite3 python manage.py test lists,
+    only pinned reads can see a new list.
+    """
+    multi_db = True
+
+    def test_client_sees_its_own_write_but_others_do_not(self):
+        response = self.client.post('/lists/new', {'text': 'new item'})
+        list_url = response['Location']
+        self.assertEqual(self.client.get(list_url).status_code, 200)
+
+        self.client.cookies.clear()
+        with self.assertRaises(List.DoesNotExist), \
+                self.assertLogs('django.request', 'ERROR'):
+            self.client.get(list_url)
+
+    def test_first_login_is_seen_after_the_redirect(self):
+        user_cache.clear()
+        token = Token.objects.create(email='new@example.com')
+        response = self.client.get(f'/accounts/login?token={token.uid}')
+        self.assertIn(settings.READ_YOUR_WRITES_COOKIE, response.cookies)
+        response = self.client.get('/')
+        self.assertTrue(response.context['user'].is_authenticated)
+
+    def stale_copy_on_replica(self):
+        """Make a list whose second item hasn't reached the replica."""
+        cache.clear()
+        list_ = List.create_new(first_item_text='old item')
+        replica = settings.DATABASE_REPLICAS[0]
+        List.objects.using(replica).bulk_create([list_])
+        Item.objects.using(replica).bulk_create(
+            list(Item.objects.using('default').filter(list=list_))
+        )
+        list_.add_items(['new item'])
+        return list_
+
+    def test_cached_page_is_not_filled_from_a_lagging_replica(self):
+        list_ = self.stale_copy_on_replica()
+        for _ in range(2):
+            response = self.client.get(f'/lists/{list_.id}/')
+            self.assertContains(response, 'new item')
+
+    def test_api_etag_is_not_paired_with_a_lagging_replica(self):
+        list_ = self.stale_copy_on_replica()
+        response = self.client.get(f'/api/lists/{list_.id}/')
+        self.assertEqual(
+            [item['text'] for item in response.json()['items']],
+            ['old item', 'new item']
+        )
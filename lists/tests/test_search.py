@@ -0,0 +1,106 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from lists.models import Item, List
+from lists.search import search_items
+
+User = get_user_model()
+
+
+class SearchItemsTest(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email='me@example.com')
+        self.friend = User.objects.create(email='friend@example.com')
+        self.mine = List.create_new(
+            first_item_text='buy peacock feathers', owner=self.user
+        )
+        self.shared = List.create_new(
+            first_item_text='peacock lure', owner=self.friend
+        )
+        self.shared.shared_with.add(self.user)
+        self.private = List.create_new(
+            first_item_text='peacock secrets', owner=self.friend
+        )
+
+    def texts(self, page):
+        return [item.text for item in page.results]
+
+    def test_finds_items_in_owned_and_shared_lists_only(self):
+        results = search_items(self.user, 'peacock')
+        self.assertEqual(
+            sorted(self.texts(results)),
+            ['buy peacock feathers', 'peacock lure']
+        )
+
+    def test_results_carry_list_name(self):
+        Item.objects.create(list=self.mine, text='make a fly')
+        [item] = search_items(self.user, 'fly').results
+        self.assertEqual(item.list_id, self.mine.id)
+        self.assertEqual(item.list_name, 'buy peacock feathers')
+
+    def test_all_words_must_match(self):
+        self.assertEqual(
+            self.texts(search_items(self.user, 'peacock feathers')),
+            ['buy peacock feathers']
+        )
+
+    def test_fts_syntax_in_query_is_treated_as_text(self):
+        self.assertEqual(
+            self.texts(search_items(self.user, 'peacock" OR "secrets')), []
+        )
+        self.assertEqual(self.texts(search_items(self.user, 'NEAR(')), [])
+
+    def test_blank_query_finds_nothing(self):
+        self.assertEqual(self.texts(search_items(self.user, '  ')), [])
+
+    def test_index_follows_item_edits_and_deletes(self):
+        item = Item.objects.create(list=self.mine, text='walrus')
+        item.text = 'narwhal'
+        item.save()
+        self.assertEqual(self.texts(search_items(self.user, 'walrus')), [])
+        self.assertEqual(
+            self.texts(search_items(self.user, 'narwhal')), ['narwhal']
+        )
+        item.delete()
+        self.assertEqual(self.texts(search_items(self.user, 'narwhal')), [])
+
+    def test_index_includes_bulk_added_items(self):
+        self.mine.add_items(['walrus one', 'walrus two'])
+        self.assertEqual(len(search_items(self.user, 'walrus').results), 2)
+
+    def test_better_matches_rank_first(self):
+        self.mine.add_items([
+            'walrus and other things entirely unrelated to it',
+            'walrus walrus',
+        ])
+        results = search_items(self.user, 'walrus')
+        if connection.vendor == 'sqlite':
+            self.assertEqual(self.texts(results)[0], 'walrus walrus')
+
+    def test_paginates(self):
+        self.mine.add_items([f'walrus {i}' for i in range(5)])
+        first = search_items(self.user, 'walrus', page=1, size=2)
+        third = search_items(self.user, 'walrus', page=3, size=2)
+        self.assertEqual(len(first.results), 2)
+        self.assertTrue(first.has_next)
+        self.assertFalse(first.has_previous)
+        self.assertEqual(len(third.results), 1)
+        self.assertFalse(third.has_next)
+        self.assertTrue(third.has_previous)
+
+
+class SearchViewTest(TestCase):
+
+    def test_redirects_anonymous_users_home(self):
+        response = self.client.get('/lists/search/?q=peacock')
+        self.assertRedirects(response, '/')
+
+    def test_renders_results(self):
+        user = User.objects.create(email='me@example.com')
+        List.create_new(first_item_text='buy peacock feathers', owner=user)
+        self.client.force_login(user)
+        response = self.client.get('/lists/search/?q=peacock')
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertContains(response, 'buy peacock feathers')
@@ -0,0 +1,273 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import (
+    DEFAULT_DB_ALIAS, IntegrityError, OperationalError, connections
+)
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from lists.management.commands.verify_item_counts import find_drifted_lists
+from lists.models import IdSequence, Item, List
+from lists.search import search_items
+from lists.sharding import allocate_list_ids, shard_for_list
+
+User = get_user_model()
+
+SHARDS = [DEFAULT_DB_ALIAS, 'test_shard1', 'test_shard2']
+
+
+class ShardsMixin(object):
+    """Runs against two extra SQLite files alongside the test database,
+    set up as shards for the duration of the class."""
+    multi_db = True
+
+    @classmethod
+    def setUpClass(cls):
+        cls.shard_dir = tempfile.mkdtemp()
+        for alias in SHARDS[1:]:
+            connections.databases[alias] = {
+                **settings.DATABASES[DEFAULT_DB_ALIAS],
+                'NAME': os.path.join(cls.shard_dir, f'{alias}.sqlite3'),
+            }
+            call_command('migrate', database=alias, verbosity=0)
+        cls.shards = override_settings(LIST_SHARDS=SHARDS)
+        cls.shards.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.shards.disable()
+        for alias in SHARDS[1:]:
+            connections[alias].close()
+            del connections.databases[alias]
+            delattr(connections._connections, alias)
+        shutil.rmtree(cls.shard_dir)
+
+    def lists_on(self, alias):
+        return set(List.objects.using(alias).values_list('id', flat=True))
+
+
+class ShardedTestCase(ShardsMixin, TestCase):
+    pass
+
+
+class ListPlacementTest(ShardedTestCase):
+
+    def test_new_lists_go_to_the_shard_for_their_id(self):
+        for _ in range(6):
+            list_ = List.create_new(first_item_text='item')
+            self.assertEqual(list_._state.db, shard_for_list(list_.id))
+            self.assertEqual(
+                List.objects.using(list_._state.db).get(id=list_.id).name,
+                'item'
+            )
+            self.assertEqual(list(
+                Item.objects.using(list_._state.db).filter(
+                    list_id=list_.id
+                ).values_list('text', flat=True)
+            ), ['item'])
+
+    def test_ids_are_unique_across_shards(self):
+        ids = [List.create_new(first_item_text='x').id for _ in range(9)]
+        self.assertEqual(len(set(ids)), 9)
+        for alias in SHARDS:
+            self.assertEqual(len(self.lists_on(alias)), 3)
+
+    def test_allocator_starts_above_existing_lists(self):
+        List.objects.using('test_shard2').create(id=50)
+        self.assertEqual(list(allocate_list_ids(2)), [51, 52])
+        self.assertEqual(list(allocate_list_ids(1)), [53])
+        self.assertEqual(IdSequence.objects.get(name='list').value, 53)
+
+
+class ShardedWritesTest(ShardedTestCase):
+
+    def test_failed_first_item_leaves_no_list_behind(self):
+        with patch.object(Item, 'save', side_effect=IntegrityError):
+            for _ in range(3):
+                with self.assertRaises(IntegrityError):
+                    List.create_new(first_item_text='item')
+        for alias in SHARDS:
+            self.assertEqual(self.lists_on(alias), set())
+
+    def test_sharing_from_the_users_side_uses_the_lists_shard(self):
+        user = User.objects.create(email='c@d.com')
+        lists = [List.create_new(first_item_text='x') for _ in range(3)]
+        user.shared_lists.add(*lists)
+        self.assertEqual(List.shared_with_user(user), lists)
+        for list_ in lists:
+            self.assertEqual(list(
+                List.shared_with.through.objects.using(
+                    list_._state.db
+                ).values_list('list_id', 'user_id')
+            ), [(list_.id, 'c@d.com')])
+
+        user.shared_lists.remove(lists[0])
+        self.assertEqual(List.shared_with_user(user), lists[1:])
+        user.shared_lists.clear()
+        self.assertEqual(List.shared_with_user(user), [])
+        for alias in SHARDS:
+            self.assertFalse(
+                List.shared_with.through.objects.using(alias).exists()
+            )
+
+
+class ShardedRetryTest(ShardsMixin, TransactionTestCase):
+
+    def test_locked_shard_retries_whole_view_without_leftovers(self):
+        save = Item.save
+        calls = []
+
+        def locked_once(item, *args, **kwargs):
+            calls.append(item)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return save(item, *args, **kwargs)
+
+        with patch.object(Item, 'save', locked_once), \
+                patch('superlists.transactions.time.sleep'), \
+                self.assertLogs('superlists.transactions', 'WARNING') as logs:
+            response = self.client.post('/lists/new', {'text': 'new item'})
+        self.assertEqual(logs.output, [
+            'WARNING:superlists.transactions:'
+            'Database locked, retrying (attempt 1)',
+        ])
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            sum(len(self.lists_on(alias)) for alias in SHARDS), 1
+        )
+        self.assertEqual(
+            sum(Item.objects.using(alias).count() for alias in SHARDS), 1
+        )
+
+
+    def test_list_views_take_the_write_lock_on_the_lists_shard(self):
+        lists = [List.create_new(first_item_text='x') for _ in range(3)]
+        list_ = next(
+            list_ for list_ in lists if list_._state.db != DEFAULT_DB_ALIAS
+        )
+        for url, data in (
+            (f'/lists/{list_.id}/', {'text': 'more'}),
+            (f'/lists/{list_.id}/share', {'sharee': 'new@example.com'}),
+        ):
+            with CaptureQueriesContext(
+                connections[DEFAULT_DB_ALIAS]
+            ) as on_default, CaptureQueriesContext(
+                connections[list_._state.db]
+            ) as on_shard:
+                self.client.post(url, data)
+            self.assertIn(
+                'BEGIN IMMEDIATE', [query['sql'] for query in on_shard]
+            )
+            self.assertNotIn(
+                'BEGIN IMMEDIATE', [query['sql'] for query in on_default]
+            )
+        self.assertTrue(User.objects.using(DEFAULT_DB_ALIAS).filter(
+            email='new@example.com'
+        ).exists())
+
+
+class ShardedViewsTest(ShardedTestCase):
+
+    def test_view_list_reads_and_writes_the_lists_shard(self):
+        lists = [List.create_new(first_item_text=f'l{n}') for n in range(3)]
+        for list_ in lists:
+            response = self.client.post(
+                f'/lists/{list_.id}/', data={'text': 'more'}
+            )
+            self.assertRedirects(response, f'/lists/{list_.id}/')
+            response = self.client.get(f'/lists/{list_.id}/')
+            self.assertContains(response, f'l{list_.id - lists[0].id}')
+            self.assertContains(response, 'more')
+            list_.refresh_from_db()
+            self.assertEqual(list_.item_count, 2)
+
+    def test_new_list_saves_logged_in_owner(self):
+        user = User.objects.create(email='a@b.com')
+        self.client.force_login(user)
+        for _ in range(3):
+            self.client.post('/lists/new', data={'text': 'new item'})
+        self.assertEqual(
+            [list_.owner for list_ in List.owned_by(user)], [user] * 3
+        )
+
+    def test_my_lists_merges_every_shard(self):
+        owner = User.objects.create(email='a@b.com')
+        lists = [
+            List.create_new(first_item_text=f'list {n}', owner=owner)
+            for n in range(4)
+        ]
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertEqual(list(response.context['owned_lists']), lists)
+        self.assertEqual(
+            {list_._state.db for list_ in lists}, set(SHARDS)
+        )
+
+    def test_sharing_writes_to_the_lists_shard(self):
+        lists = [List.create_new(first_item_text='x') for _ in range(3)]
+        for list_ in lists:
+            self.client.post(
+                f'/lists/{list_.id}/share', data={'sharee': 'c@d.com'}
+            )
+        self.assertEqual(
+            List.shared_with_user(User.objects.get(email='c@d.com')), lists
+        )
+        for list_ in lists:
+            self.assertTrue(List.shared_with.through.objects.using(
+                list_._state.db
+            ).filter(list_id=list_.id, user_id='c@d.com').exists())
+
+
+class ShardedCommandsTest(ShardedTestCase):
+
+    def test_load_lists_spreads_lists_over_shards(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.ndjson', delete=False
+        ) as f:
+            for n in range(6):
+                f.write(json.dumps({'items': [f'a{n}', f'b{n}']}) + '\n')
+        self.addCleanup(os.remove, f.name)
+        call_command('load_lists', f.name, stdout=StringIO())
+        for alias in SHARDS:
+            ids = self.lists_on(alias)
+            self.assertEqual(len(ids), 2)
+            self.assertEqual({shard_for_list(id_) for id_ in ids}, {alias})
+            self.assertEqual(
+                Item.objects.using(alias).filter(list_id__in=ids).count(), 4
+            )
+
+    def test_verify_item_counts_checks_every_shard(self):
+        lists = [List.create_new(first_item_text='x') for _ in range(3)]
+        for list_ in lists:
+            List.objects.using(list_._state.db).filter(
+                id=list_.id
+            ).update(item_count=5)
+        self.assertEqual(
+            find_drifted_lists(), [(list_.id, 5, 1) for list_ in lists]
+        )
+        call_command('verify_item_counts', repair=True, stdout=StringIO())
+        self.assertEqual(find_drifted_lists(), [])
+
+    def test_search_finds_items_on_every_shard(self):
+        owner = User.objects.create(email='a@b.com')
+        lists = [
+            List.create_new(first_item_text=f'peacock {n}', owner=owner)
+            for n in range(3)
+        ]
+        results = search_items(owner, 'peacock', size=2)
+        self.assertEqual(len(results.results), 2)
+        self.assertTrue(results.has_next)
+        everything = search_items(owner, 'peacock').results
+        self.assertEqual(
+            sorted(item.list_id for item in everything),
+            [list_.id for list_ in lists]
+        )
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from lists.models import List
+from superlists.backends.sqlite3.base import DatabaseWrapper
+from superlists.transactions import (
+    contention_stats, immediate_atomic, is_busy_error, retry_on_busy
+)
+
+
+def locked():
+    return OperationalError('database is locked')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+@patch('superlists.transactions.time.sleep')
+class RetryOnBusyTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_retries_until_write_succeeds(self, mock_sleep):
+        calls = []
+
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise locked()
+            return List.objects.create()
+
+        with self.assertLogs('superlists.transactions', 'WARNING') as logs:
+            list_ = retry_on_busy(write)
+        self.assertEqual(logs.output, [
+            'WARNING:superlists.transactions:'
+            'Database locked, retrying (attempt 1)',
+            'WARNING:superlists.transactions:'
+            'Database locked, retrying (attempt 2)',
+        ])
+        self.assertEqual(List.objects.get(), list_)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        self.assertEqual(contention_stats(), {'busy': 2, 'failed': 0})
+
+    def test_gives_up_after_configured_retries(self, mock_sleep):
+        def write():
+            raise locked()
+
+        with self.assertRaises(OperationalError), \
+                self.assertLogs('superlists.transactions', 'WARNING') as logs:
+            retry_on_busy(write)
+        attempts = settings.SQLITE_WRITE_RETRIES + 1
+        self.assertEqual(len(logs.output), attempts)
+        self.assertEqual(
+            logs.output[-1],
+            'ERROR:superlists.transactions:'
+            f'Gave up after {attempts} locked attempts'
+        )
+        self.assertEqual(
+            contention_stats(), {'busy': attempts, 'failed': 1}
+        )
+
+    def test_backoff_is_jittered_and_bounded(self, mock_sleep):
+        def write():
+            raise locked()
+
+        with self.assertRaises(OperationalError), \
+                self.assertLogs('superlists.transactions', 'WARNING'):
+            retry_on_busy(write)
+        for (delay,), _ in mock_sleep.call_args_list:
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, settings.SQLITE_RETRY_MAX_BACKOFF)
+
+    def test_other_errors_are_not_retried(self, mock_sleep):
+        def write():
+            raise OperationalError('no such table: nope')
+
+        with self.assertRaises(OperationalError):
+            retry_on_busy(write)
+        self.assertFalse(mock_sleep.called)
+
+    def test_does_not_retry_inside_outer_transaction(self, mock_sleep):
+        def write():
+            raise locked()
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                retry_on_busy(write)
+        self.assertFalse(mock_sleep.called)
+
+    def test_failed_attempt_is_rolled_back(self, mock_sleep):
+        calls = []
+
+        def write():
+            List.objects.create()
+            calls.append(1)
+            if len(calls) == 1:
+                raise locked()
+
+        with self.assertLogs('superlists.transactions', 'WARNING') as logs:
+            retry_on_busy(write)
+        self.assertEqual(logs.output, [
+            'WARNING:superlists.transactions:'
+            'Database locked, retrying (attempt 1)',
+        ])
+        self.assertEqual(List.objects.count(), 1)
+
+
+class ImmediateAtomicTest(TransactionTestCase):
+
+    def test_outermost_block_begins_immediate(self):
+        with CaptureQueriesContext(connection) as captured:
+            with immediate_atomic():
+                List.objects.create()
+        self.assertEqual(captured[0]['sql'], 'BEGIN IMMEDIATE')
+
+    def test_plain_atomic_is_unaffected(self):
+        with immediate_atomic():
+            pass
+        with CaptureQueriesContext(connection) as captured:
+            with transaction.atomic():
+                List.objects.create()
+        self.assertEqual(captured[0]['sql'], 'BEGIN')
+
+
+class WriteViewsTest(TestCase):
+
+    def test_write_views_go_through_retry(self):
+        with patch('superlists.transactions.retry_on_busy',
+                   side_effect=lambda func, **kwargs: func()) as mock_retry:
+            self.client.post('/lists/new', data={'text': 'A new list item'})
+        self.assertTrue(mock_retry.called)
+
+    def test_reads_do_not(self):
+        list_ = List.create_new(first_item_text='item')
+        with patch('superlists.transactions.retry_on_busy') as mock_retry:
+            self.client.get(f'/lists/{list_.id}/')
+        self.assertFalse(mock_retry.called)
+
+
+class SQLiteLockTest(SimpleTestCase):
+
+    def test_immediate_transaction_locks_out_other_writers(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        name = os.path.join(tmpdir.name, 'db.sqlite3')
+        wrapper = DatabaseWrapper(
+            {**settings.DATABASES['default'], 'NAME': name}, alias='lock_test'
+        )
+        self.addCleanup(wrapper.close)
+        other = sqlite3.connect(name, timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        wrapper.begin_immediate = True
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        with self.assertRaises(sqlite3.OperationalError) as cm:
+            other.execute('BEGIN IMMEDIATE')
+        self.assertTrue(is_busy_error(cm.exception))
+        wrapper.connection.execute('ROLLBACK')
+        other.execute('BEGIN IMMEDIATE')
+
+
+class ContentionStatsCommandTest(TestCase):
+
+    def test_shows_and_resets_counters(self):
+        cache.set('db:contention:busy', 4, None)
+        stdout = StringIO()
+        call_command('contention_stats', '--reset', stdout=stdout)
+        self.assertIn('busy: 4', stdout.getvalue())
+        self.assertEqual(contention_stats(), {'busy': 0, 'failed': 0})
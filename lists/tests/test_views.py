@@ -63,14 +63,19 @@
 
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest
-from django.test import TestCase
+from django.test import Client, TestCase
 from django.urls import resolve
+from django.utils import timezone
 from django.utils.html import escape
+from django.utils.http import http_date
+from datetime import timedelta
 from unittest.mock import patch, Mock
+import json
+import time
 import unittest
 
 from lists.forms import (
-    DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR,
+    DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR, INVALID_SHAREE_ERROR,
     ExistingListItemForm, ItemForm
 )
 from lists.models import Item, List
@@ -219,6 +224,185 @@ class ListViewTest(TestCase):
         self.assertNotContains(response, 'other list item 1')
         self.assertNotContains(response, 'other list item 2')
 
+    def test_displays_each_sharee_once(self):
+        User.objects.create(email='friend@example.com')
+        list_ = List.objects.create()
+        list_.shared_with.add('friend@example.com')
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertContains(response, 'class="list-sharee"', count=1)
+
+    def test_query_count_does_not_grow_with_list_length(self):
+        owner = User.objects.create(email='owner@example.com')
+        list_ = List.create_new(first_item_text='item 0', owner=owner)
+        for i in range(1, 20):
+            Item.objects.create(list=list_, text=f'item {i}')
+        for i in range(5):
+            User.objects.create(email=f'friend{i}@example.com')
+            list_.shared_with.add(f'friend{i}@example.com')
+        # updated_at for the conditional GET, then list, items, sharees
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/lists/{list_.id}/')
+        self.assertContains(response, 'item 19')
+        self.assertContains(response, 'owner@example.com')
+        self.assertContains(response, 'friend4@example.com')
+
+    def test_paginates_long_lists(self):
+        list_ = List.objects.create()
+        list_.add_items([f'item {i}' for i in range(1, 6)])
+        response = self.client.get(f'/lists/{list_.id}/?page_size=2')
+        self.assertContains(response, '2: item 2')
+        self.assertNotContains(response, '3: item 3')
+        self.assertContains(response, 'id="id_next_page"')
+        next_query = response.context['snapshot'].page.next_query
+        response = self.client.get(f'/lists/{list_.id}/{next_query}')
+        self.assertContains(response, '3: item 3')
+        self.assertContains(response, '4: item 4')
+        self.assertNotContains(response, '5: item 5')
+        self.assertContains(response, 'id="id_previous_page"')
+
+    def test_page_size_is_capped(self):
+        list_ = List.objects.create()
+        with self.settings(LIST_MAX_PAGE_SIZE=2):
+            response = self.client.get(f'/lists/{list_.id}/?page_size=500')
+        self.assertEqual(response.context['snapshot'].page.size, 2)
+
+    def test_ignores_malformed_cursors(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/lists/{list_.id}/?after=bogus')
+        self.assertContains(response, '1: item 1')
+
+    def test_sends_last_modified(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertEqual(
+            response['Last-Modified'],
+            http_date(List.objects.get(id=list_.id).updated_at.timestamp())
+        )
+
+    def test_unchanged_list_gets_304_from_a_single_query(self):
+        list_ = List.create_new(first_item_text='item 1')
+        last_modified = self.client.get(f'/lists/{list_.id}/')['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/lists/{list_.id}/', HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_within_the_same_second_is_caught_by_etag(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/lists/{list_.id}/')
+        Item.objects.create(list=list_, text='item 2')
+        response = self.client.get(
+            f'/lists/{list_.id}/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertContains(response, 'item 2')
+
+    def test_list_changed_since_gets_full_page(self):
+        list_ = List.create_new(first_item_text='item 1')
+        long_ago = http_date(time.time() - 3600)
+        response = self.client.get(
+            f'/lists/{list_.id}/', HTTP_IF_MODIFIED_SINCE=long_ago
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_revalidating_after_login_gets_full_page(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertEqual(response['Vary'], 'Cookie')
+        self.client.force_login(User.objects.create(email='a@b.com'))
+        response = self.client.get(
+            f'/lists/{list_.id}/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'a@b.com')
+
+    def test_pending_messages_are_shown_to_a_revalidating_client(self):
+        list_ = List.create_new(first_item_text='item 1')
+        response = self.client.get(f'/lists/{list_.id}/')
+        response = self.client.post(
+            f'/lists/{list_.id}/share', data={'sharee': 'not-an-email'},
+            follow=True, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertContains(
+            response, escape(INVALID_SHAREE_ERROR.format('not-an-email'))
+        )
+
+    def test_stream_mode_streams_every_item(self):
+        owner = User.objects.create(email='owner@example.com')
+        list_ = List.objects.create(owner=owner)
+        list_.add_items([f'item {i}' for i in range(1, 8)])
+        with self.settings(LIST_PAGE_SIZE=2, LIST_STREAM_CHUNK_SIZE=3):
+            response = self.client.get(f'/lists/{list_.id}/?stream=1')
+            content = b''.join(response.streaming_content).decode()
+        self.assertTrue(response.streaming)
+        self.assertIn('1: item 1', content)
+        self.assertIn('7: item 7', content)
+        self.assertNotIn('id="id_next_page"', content)
+        self.assertIn('owner@example.com', content)
+        self.assertIn('</html>', content)
+
+    def test_stream_mode_sets_csrf_cookie_for_new_visitors(self):
+        list_ = List.create_new(first_item_text='item 1')
+        client = Client(enforce_csrf_checks=True)
+        response = client.get(f'/lists/{list_.id}/?stream=1')
+        b''.join(response.streaming_content)
+        token = response.cookies['csrftoken'].value
+        response = client.post(
+            f'/lists/{list_.id}/',
+            data={'text': 'item 2', 'csrfmiddlewaretoken': token}
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_stream_mode_uses_up_pending_messages(self):
+        list_ = List.create_new(first_item_text='item 1')
+        self.client.post(
+            f'/lists/{list_.id}/share', data={'sharee': 'not-an-email'}
+        )
+        warning = escape(INVALID_SHAREE_ERROR.format('not-an-email'))
+        response = self.client.get(f'/lists/{list_.id}/?stream=1')
+        self.assertIn(
+            warning, b''.join(response.streaming_content).decode()
+        )
+        response = self.client.get(f'/lists/{list_.id}/?stream=1')
+        self.assertNotIn(
+            warning, b''.join(response.streaming_content).decode()
+        )
+
+    def test_repeat_GET_serves_cached_fragments(self):
+        list_ = List.create_new(first_item_text='item 0')
+        self.client.get(f'/lists/{list_.id}/')
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/lists/{list_.id}/')
+        self.assertContains(response, '1: item 0')
+
+    def test_cached_fragments_are_not_served_after_item_added(self):
+        list_ = List.create_new(first_item_text='item 0')
+        self.client.get(f'/lists/{list_.id}/')
+        self.client.post(f'/lists/{list_.id}/', data={'text': 'item 1'})
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertContains(response, '2: item 1')
+
+    def test_cached_fragments_are_not_served_after_item_deleted(self):
+        list_ = List.create_new(first_item_text='item 0')
+        Item.objects.create(list=list_, text='item 1')
+        self.client.get(f'/lists/{list_.id}/')
+        Item.objects.get(text='item 1').delete()
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertNotContains(response, 'item 1')
+
+    def test_cached_fragments_are_not_served_after_sharing(self):
+        user = User.objects.create(email='friend@example.com')
+        list_ = List.create_new(first_item_text='item 0')
+        self.client.get(f'/lists/{list_.id}/')
+        user.shared_lists.add(list_)
+        response = self.client.get(f'/lists/{list_.id}/')
+        self.assertContains(response, 'friend@example.com')
+
     def test_can_save_a_POST_request_to_an_existing_list(self):
         other_list = List.objects.create()
         correct_list = List.objects.create()
@@ -292,6 +476,110 @@ class ListViewTest(TestCase):
         self.assertEqual(Item.objects.all().count(), 1)
 
 
+class BulkAddItemsTest(TestCase):
+
+    def test_adds_all_posted_items(self):
+        list_ = List.create_new(first_item_text='first')
+        self.client.post(
+            f'/lists/{list_.id}/items/bulk',
+            data={'text': ['second', 'third']}
+        )
+        self.assertEqual(
+            [item.text for item in list_.item_set.all()],
+            ['first', 'second', 'third']
+        )
+
+    def test_reports_result_for_each_item(self):
+        list_ = List.create_new(first_item_text='first')
+        response = self.client.post(
+            f'/lists/{list_.id}/items/bulk',
+            data={'text': ['first', 'second', '']}
+        )
+        self.assertEqual(response.json(), {
+            'list': list_.id,
+            'results': [
+                {'text': 'first', 'status': 'duplicate',
+                 'error': DUPLICATE_ITEM_ERROR},
+                {'text': 'second', 'status': 'added', 'error': None},
+                {'text': '', 'status': 'empty', 'error': EMPTY_ITEM_ERROR},
+            ]
+        })
+
+    def test_404s_for_missing_list(self):
+        response = self.client.post('/lists/999/items/bulk', data={'text': 'a'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_only_accepts_POST(self):
+        list_ = List.objects.create()
+        response = self.client.get(f'/lists/{list_.id}/items/bulk')
+        self.assertEqual(response.status_code, 405)
+
+
+class ExportListTest(TestCase):
+
+    def setUp(self):
+        self.list_ = List.create_new(first_item_text='item 1')
+        self.list_.add_items(['item, "2"', 'item 3'])
+        self.ids = list(self.list_.item_set.values_list('id', flat=True))
+
+    def export(self, format_):
+        with self.settings(LIST_STREAM_CHUNK_SIZE=2):
+            response = self.client.get(
+                f'/lists/{self.list_.id}/export.{format_}'
+            )
+            self.assertTrue(response.streaming)
+            return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        response, content = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="list-{self.list_.id}.csv"'
+        )
+        self.assertEqual(content, (
+            'id,text\r\n'
+            f'{self.ids[0]},item 1\r\n'
+            f'{self.ids[1]},"item, ""2"""\r\n'
+            f'{self.ids[2]},item 3\r\n'
+        ))
+
+    def test_json_export(self):
+        response, content = self.export('json')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(content), {
+            'id': self.list_.id,
+            'name': 'item 1',
+            'items': [
+                {'id': self.ids[0], 'text': 'item 1'},
+                {'id': self.ids[1], 'text': 'item, "2"'},
+                {'id': self.ids[2], 'text': 'item 3'},
+            ]
+        })
+
+    def test_json_export_of_empty_list(self):
+        empty_list = List.objects.create()
+        response = self.client.get(f'/lists/{empty_list.id}/export.json')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(content)['items'], [])
+
+    def test_ndjson_export(self):
+        response, content = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [
+                {'id': self.ids[0], 'text': 'item 1'},
+                {'id': self.ids[1], 'text': 'item, "2"'},
+                {'id': self.ids[2], 'text': 'item 3'},
+            ]
+        )
+
+    def test_unknown_format_404s(self):
+        response = self.client.get(f'/lists/{self.list_.id}/export.xml')
+        self.assertEqual(response.status_code, 404)
+
+
 class MyListsTest(TestCase):
 
     def test_my_lists_url_renders_my_lists_template(self):
@@ -305,6 +593,110 @@ class MyListsTest(TestCase):
         response = self.client.get('/lists/users/a@b.com/')
         self.assertEqual(response.context['owner'], correct_user)
 
+    def test_passes_owned_and_shared_lists_to_template(self):
+        owner = User.objects.create(email='a@b.com')
+        friend = User.objects.create(email='friend@b.com')
+        own_list = List.create_new(first_item_text='mine', owner=owner)
+        shared_list = List.create_new(first_item_text='theirs', owner=friend)
+        shared_list.shared_with.add(owner)
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertEqual(response.context['owned_lists'], [own_list])
+        self.assertEqual(response.context['shared_lists'], [shared_list])
+        self.assertContains(response, 'friend@b.com')
+
+    def test_shows_item_counts(self):
+        owner = User.objects.create(email='a@b.com')
+        list_ = List.create_new(first_item_text='mine', owner=owner)
+        list_.add_items(['second', 'third'])
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertContains(response, '(3 items)')
+
+    def test_query_count_does_not_grow_with_number_of_lists(self):
+        owner = User.objects.create(email='a@b.com')
+        friend = User.objects.create(email='friend@b.com')
+        for i in range(10):
+            List.create_new(first_item_text=f'mine {i}', owner=owner)
+            shared = List.create_new(first_item_text=f'theirs {i}', owner=friend)
+            shared.shared_with.add(owner)
+        with self.assertNumQueries(4):
+            self.client.get('/lists/users/a@b.com/')
+
+    def test_unchanged_lists_get_304(self):
+        owner = User.objects.create(email='a@b.com')
+        List.create_new(first_item_text='mine', owner=owner)
+        response = self.client.get('/lists/users/a@b.com/')
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/lists/users/a@b.com/',
+                HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_newly_shared_list_gets_full_page(self):
+        owner = User.objects.create(email='a@b.com')
+        List.create_new(first_item_text='mine', owner=owner)
+        response = self.client.get('/lists/users/a@b.com/')
+        other_list = List.create_new(first_item_text='theirs')
+        other_list.shared_with.add(owner)
+        response = self.client.get(
+            '/lists/users/a@b.com/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_revalidating_after_login_gets_full_page(self):
+        User.objects.create(email='a@b.com')
+        response = self.client.get('/lists/users/a@b.com/')
+        self.assertEqual(response['Vary'], 'Cookie')
+        self.client.force_login(User.objects.get(email='a@b.com'))
+        response = self.client.get(
+            '/lists/users/a@b.com/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+            HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Log out')
+
+    def get_after_change(self, change):
+        response = self.client.get('/lists/users/a@b.com/')
+        # Last-Modified has one-second resolution.
+        later = timezone.now() + timedelta(seconds=5)
+        with patch('lists.models.timezone.now', return_value=later):
+            change()
+        return self.client.get(
+            '/lists/users/a@b.com/',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+
+    def test_unshared_list_gets_full_page(self):
+        owner = User.objects.create(email='a@b.com')
+        List.create_new(first_item_text='mine', owner=owner)
+        shared_list = List.create_new(first_item_text='theirs')
+        shared_list.shared_with.add(owner)
+        response = self.get_after_change(
+            lambda: shared_list.shared_with.remove(owner)
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'theirs')
+
+    def test_deleted_list_gets_full_page(self):
+        owner = User.objects.create(email='a@b.com')
+        List.create_new(first_item_text='older', owner=owner)
+        newer = List.create_new(first_item_text='newer', owner=owner)
+        response = self.get_after_change(newer.delete)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'newer')
+
+    def test_list_of_deleted_shared_list_gets_full_page(self):
+        owner = User.objects.create(email='a@b.com')
+        List.create_new(first_item_text='mine', owner=owner)
+        shared_list = List.create_new(first_item_text='theirs')
+        shared_list.shared_with.add(owner)
+        response = self.get_after_change(shared_list.delete)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'theirs')
+
 
 class ShareListTest(TestCase):
 
@@ -326,6 +718,32 @@ class ShareListTest(TestCase):
         )
         self.assertRedirects(response, list_.get_absolute_url())
 
+    def test_shares_with_many_emails_in_one_post(self):
+        list_ = List.objects.create()
+        self.client.post(f'/lists/{list_.id}/share', {
+            'sharee': ['a@example.com, b@example.com', 'c@example.com'],
+        })
+        self.assertEqual(
+            sorted(user.email for user in list_.shared_with.all()),
+            ['a@example.com', 'b@example.com', 'c@example.com']
+        )
+
+    def test_warns_about_invalid_emails_and_shares_the_rest(self):
+        list_ = List.objects.create()
+        response = self.client.post(
+            f'/lists/{list_.id}/share',
+            {'sharee': 'a@example.com not-an-email'},
+            follow=True
+        )
+        self.assertEqual(
+            [user.email for user in list_.shared_with.all()],
+            ['a@example.com']
+        )
+        message = list(response.context['messages'])[0]
+        self.assertEqual(
+            message.message, INVALID_SHAREE_ERROR.format('not-an-email')
+        )
+
 
 #                Useful Commands and Concepts
 # Running the Django dev server
@@ -20,5 +20,12 @@ urlpatterns = [
     url(r'^new$', views.new_list, name='new_list'),
     url(r'^(\d+)/$', views.view_list, name='view_list'),
     url(r'^(\d+)/share$', views.share_list, name='share_list'),
+    url(r'^(\d+)/items/bulk$', views.bulk_add_items, name='bulk_add_items'),
+    url(
+        r'^(\d+)/export\.(csv|json|ndjson)$',
+        views.export_list,
+        name='export_list'
+    ),
     url(r'^users/(.+)/$', views.my_lists, name='my_lists'),
+    url(r'^search/$', views.search, name='search'),
 ]
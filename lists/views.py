@@ -13,15 +13,32 @@
 # 3. The view function processes the request and returns an HTTP
 #   response.
 
+import hashlib
+
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
-from django.shortcuts import redirect, render
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import get_token
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import get_template, render_to_string
+from django.views.decorators.http import condition, require_POST
+from django.views.decorators.vary import vary_on_cookie
 
-from lists.forms import ExistingListItemForm, ItemForm, NewListForm
-from lists.models import List
+from lists.export import EXPORT_FORMATS
+from lists.forms import (
+    DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR, INVALID_SHAREE_ERROR,
+    ExistingListItemForm, ItemForm, NewListForm, parse_sharees
+)
+from lists.models import ITEM_DUPLICATE, ITEM_EMPTY, List, ListSnapshot
+from lists.search import search_items
+from superlists.transactions import write_transaction
 
 User = get_user_model()
 
+# Where list.html, rendered with streaming=True, expects the item rows.
+STREAM_ROWS_MARKER = '<!-- stream:rows -->'
+
 
 def home_page(request):
     # Refactor
@@ -41,6 +58,7 @@ def home_page(request):
     # HTML text.
 
 
+@write_transaction
 def new_list(request):
     form = NewListForm(data=request.POST)
     if form.is_valid():
@@ -49,29 +67,181 @@ def new_list(request):
     return render(request, 'home.html', {'form': form})
 
 
+def _int_param(request, name):
+    try:
+        return int(request.GET[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def _viewer(request):
+    # Pages also show who is logged in and embed their CSRF token, so a
+    # copy is only current for the same viewer. None while messages are
+    # waiting: those are shown once, so the page has to be rendered.
+    if messages.get_messages(request):
+        return None
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    return hashlib.sha1(
+        f'{request.user.pk}:{csrf_cookie}'.encode()
+    ).hexdigest()[:16]
+
+
+def _list_last_modified(request, list_id):
+    if _viewer(request) is None:
+        return None
+    if not hasattr(request, '_list_updated_at'):
+        request._list_updated_at = List.objects.on_shard(list_id).filter(
+            pk=list_id
+        ).values_list('updated_at', flat=True).first()
+    return request._list_updated_at
+
+
+def _list_etag(request, list_id):
+    # Last-Modified only has one-second resolution, so a change made in
+    # the same second as the client's copy would go unnoticed. The
+    # ETag carries the full timestamp and takes precedence when sent.
+    updated_at = _list_last_modified(request, list_id)
+    if updated_at:
+        return f'W/"{updated_at.timestamp()}-{_viewer(request)}"'
+
+
+@vary_on_cookie
+@condition(etag_func=_list_etag, last_modified_func=_list_last_modified)
+@write_transaction
 def view_list(request, list_id):
-    list_ = List.objects.get(id=list_id)
-    form = ExistingListItemForm(for_list=list_)
+    page_size = _int_param(request, 'page_size')
+    if page_size is not None:
+        page_size = min(max(page_size, 1), settings.LIST_MAX_PAGE_SIZE)
+    snapshot = ListSnapshot.load(
+        list_id,
+        after=_int_param(request, 'after'),
+        before=_int_param(request, 'before'),
+        number=_int_param(request, 'n'),
+        size=page_size,
+    )
+    list_ = snapshot.list
     if request.method == 'POST':
         form = ExistingListItemForm(for_list=list_, data=request.POST)
-        if form.is_valid():
-            form.save()
+        # save() returns None, with the error on the form, if the item
+        # turns out to be a duplicate.
+        if form.is_valid() and form.save():
             return redirect(list_)
+    else:
+        form = ExistingListItemForm(for_list=list_)
+        if request.GET.get('stream'):
+            return _stream_list_page(request, snapshot, form)
     return render(
         request,
         'list.html',
-        {'list': list_, "form": form}
+        {'list': list_, 'snapshot': snapshot, "form": form}
+    )
+
+
+def _stream_list_page(request, snapshot, form):
+    # Render the page around the table now, then send the rows a chunk
+    # at a time, so the first bytes go out before any items have been
+    # read and the whole list is never held in memory. The head has to
+    # be rendered before the response is returned: the CSRF and
+    # messages middleware look at the request on the way out, and only
+    # set the csrftoken cookie and mark messages as seen if the token
+    # has been asked for and the messages iterated by then.
+    get_token(request)
+    page = render_to_string(
+        'list.html',
+        {'list': snapshot.list, 'snapshot': snapshot, 'form': form,
+         'streaming': True},
+        request=request
+    )
+    head, tail = page.split(STREAM_ROWS_MARKER)
+    return StreamingHttpResponse(
+        _stream_rows(snapshot.list, head, tail)
     )
 
 
+def _stream_rows(list_, head, tail):
+    yield head
+    rows_template = get_template('list_rows.html')
+    number = 0
+    for chunk in list_.item_chunks():
+        rows = list(enumerate(chunk, start=number + 1))
+        number += len(chunk)
+        yield rows_template.render({'rows': rows})
+    yield tail
+
+
+@require_POST
+@write_transaction
+def bulk_add_items(request, list_id):
+    list_ = get_object_or_404(List.objects.on_shard(list_id), id=list_id)
+    errors = {
+        ITEM_DUPLICATE: DUPLICATE_ITEM_ERROR,
+        ITEM_EMPTY: EMPTY_ITEM_ERROR,
+    }
+    results = [
+        {'text': text, 'status': status, 'error': errors.get(status)}
+        for text, status in list_.add_items(request.POST.getlist('text'))
+    ]
+    return JsonResponse({'list': list_.id, 'results': results})
+
+
+def export_list(request, list_id, format_):
+    list_ = get_object_or_404(List.objects.on_shard(list_id), id=list_id)
+    content_type, exporter = EXPORT_FORMATS[format_]
+    response = StreamingHttpResponse(
+        exporter(list_), content_type=content_type
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="list-{list_.id}.{format_}"'
+    )
+    return response
+
+
+def search(request):
+    if not request.user.is_authenticated:
+        return redirect('/')
+    query = request.GET.get('q', '')
+    results = search_items(
+        request.user, query,
+        page=_int_param(request, 'page') or 1,
+        size=settings.SEARCH_PAGE_SIZE,
+    )
+    return render(request, 'search.html', {'query': query, 'results': results})
+
+
+def _my_lists_last_modified(request, email):
+    if _viewer(request) is None:
+        return None
+    if not hasattr(request, '_lists_updated_at'):
+        request._lists_updated_at = List.last_modified_for_user(email)
+    return request._lists_updated_at
+
+
+def _my_lists_etag(request, email):
+    updated_at = _my_lists_last_modified(request, email)
+    if updated_at:
+        return f'W/"{updated_at.timestamp()}-{_viewer(request)}"'
+
+
+@vary_on_cookie
+@condition(
+    etag_func=_my_lists_etag, last_modified_func=_my_lists_last_modified
+)
 def my_lists(request, email):
     owner = User.objects.get(email=email)
-    return render(request, 'my_lists.html', {'owner': owner})
+    return render(request, 'my_lists.html', {
+        'owner': owner,
+        'owned_lists': List.owned_by(owner),
+        'shared_lists': List.shared_with_user(owner),
+    })
 
 
+@write_transaction
 def share_list(request, list_id):
-    list_ = List.objects.get(id=list_id)
-    list_.shared_with.add(request.POST['sharee'])
+    list_ = List.objects.on_shard(list_id).get(id=list_id)
+    sharees, invalid = parse_sharees(request.POST.getlist('sharee'))
+    list_.share_with(sharees)
+    for email in invalid:
+        messages.warning(request, INVALID_SHAREE_ERROR.format(email))
     return redirect(list_)
 
 
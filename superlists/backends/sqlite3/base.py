@@ -0,0 +1,66 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Django's SQLite backend, applying the database's PRAGMAS setting
+    to every new connection.
+
+    Most pragmas only last as long as the connection, so they can't be
+    set once from a migration or the shell.
+
+    Setting begin_immediate makes the next transaction start with BEGIN
+    IMMEDIATE; see superlists.transactions.immediate_atomic.
+
+    It also honours CONN_HEALTH_CHECKS, which Django itself only does
+    from 4.1: a persistent connection is checked with a trivial query
+    the first time it's used in each request, and replaced if that
+    fails.
+    """
+
+    begin_immediate = False
+    health_check_done = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict.get('PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs as every request starts and finishes, so the next use of
+        # a connection that survives it gets checked.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and not self.health_check_done
+            and self.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def _start_transaction_under_autocommit(self):
+        # A plain BEGIN only takes the write lock at the first write,
+        # and a reader that wants to write then can't wait for it: it
+        # fails with SQLITE_BUSY straight away, whatever busy_timeout
+        # says. BEGIN IMMEDIATE takes the lock up front, so it waits.
+        if self.begin_immediate:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -0,0 +1,50 @@
+import fcntl
+import io
+import os
+import pickle
+import time
+import zlib
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LockedFileBasedCache(FileBasedCache):
+    """A FileBasedCache whose add() and incr() are atomic across
+    processes.
+
+    The stock backend does both as a read followed by a write, so two
+    workers can both win an add(), or both read the same count and lose
+    an increment. Here each holds an exclusive lock on a file in the
+    cache directory from the read to the write. incr() also keeps the
+    key's expiry, where the stock one resets it to the default timeout.
+    """
+    lock_filename = 'atomic.lock'
+
+    @contextmanager
+    def _locked(self):
+        self._createdir()
+        with open(os.path.join(self._dir, self.lock_filename), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            fname = self._key_to_file(key, version)
+            try:
+                with io.open(fname, 'rb') as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except FileNotFoundError:
+                expiry = value = None
+            if value is None or (expiry is not None and expiry < time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value += delta
+            timeout = None if expiry is None else expiry - time.time()
+            self.set(key, value, timeout, version)
+            return value
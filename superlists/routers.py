@@ -0,0 +1,94 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+@contextmanager
+def pin_to_primary():
+    """Send every read in the block to the primary."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class PrimaryReplicaRouter(object):
+    """Send writes to the primary and reads to a random replica in
+    DATABASE_REPLICAS.
+
+    Reads stay on the primary inside pin_to_primary() (which
+    ReadYourWritesMiddleware uses after a client writes) and inside a
+    transaction, which must see its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or _pinned.get():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def note_write(request):
+    """Mark a request that writes even though its method is safe, such as
+    the GET from a login link, so ReadYourWritesMiddleware pins the
+    client to the primary afterwards."""
+    request.wrote_to_primary = True
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def _wrote(request):
+    if request.method not in SAFE_METHODS:
+        return True
+    if getattr(request, 'wrote_to_primary', False):
+        return True
+    # A changed session is saved once the view returns, and the db and
+    # cached_db engines read it back from a replica next time.
+    session = getattr(request, 'session', None)
+    return session is not None and session.modified
+
+
+class ReadYourWritesMiddleware(object):
+    """Keep a client's reads on the primary for READ_YOUR_WRITES_SECONDS
+    after it sends a POST (or other unsafe request), changes its session
+    or makes a note_write() request, so it never sees a replica from
+    before its own change.
+
+    The pin is a plain cookie rather than a session value, because
+    loading the session is itself a read.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        cookie = settings.READ_YOUR_WRITES_COOKIE
+        if request.method not in SAFE_METHODS or cookie in request.COOKIES:
+            with pin_to_primary():
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+        if _wrote(request):
+            response.set_cookie(
+                cookie, '1',
+                max_age=settings.READ_YOUR_WRITES_SECONDS,
+                httponly=True,
+            )
+        return response
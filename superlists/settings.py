@@ -47,6 +47,7 @@ AUTHENTICATION_BACKENDS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'superlists.routers.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -79,14 +80,153 @@ WSGI_APPLICATION = 'superlists.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/1.11/ref/settings/#databases
 
+# superlists.backends.sqlite3 runs these on every new connection.
+# WAL lets readers carry on while a worker writes, and in WAL mode
+# synchronous=NORMAL only gives up durability of the last commits on
+# power loss, never consistency. busy_timeout is in milliseconds,
+# mmap_size in bytes and a negative cache_size in KiB.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'superlists.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, '../database/db.sqlite3'),
+        'PRAGMAS': SQLITE_PRAGMAS,
+        # Keep each worker's connection (and its pragmas and page
+        # cache) between requests, checking it's still usable before
+        # reuse. Django only reads CONN_HEALTH_CHECKS from 4.1, so
+        # superlists.backends.sqlite3 implements it.
+        'CONN_MAX_AGE': 10 * 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Read replicas. DJANGO_DB_REPLICAS is a comma-separated list of SQLite
+# files kept in step with the primary by whatever replicates it; each
+# becomes a replicaN alias that PrimaryReplicaRouter sends reads to.
+# Other engines (e.g. PostgreSQL standbys) can be added to DATABASES
+# and DATABASE_REPLICAS by hand.
+DATABASE_REPLICAS = []
+for n, path in enumerate(
+    filter(None, os.environ.get('DJANGO_DB_REPLICAS', '').split(',')),
+    start=1
+):
+    DATABASES[f'replica{n}'] = {**DATABASES['default'], 'NAME': path}
+    DATABASE_REPLICAS.append(f'replica{n}')
+
+# Lists, with their items and sharing rows, live on one of LIST_SHARDS
+# picked by list id; see lists.sharding. DJANGO_LIST_SHARDS is a
+# comma-separated list of SQLite files that become shard1, shard2 and
+# so on alongside default. Each needs `manage.py migrate --database`.
+LIST_SHARDS = ['default']
+for n, path in enumerate(
+    filter(None, os.environ.get('DJANGO_LIST_SHARDS', '').split(',')),
+    start=1
+):
+    DATABASES[f'shard{n}'] = {**DATABASES['default'], 'NAME': path}
+    LIST_SHARDS.append(f'shard{n}')
+
+DATABASE_ROUTERS = [
+    'lists.sharding.ListShardRouter',
+    'superlists.routers.PrimaryReplicaRouter',
+]
+
+# After a client writes, ReadYourWritesMiddleware sends its reads to
+# the primary for this many seconds, to cover replication lag.
+READ_YOUR_WRITES_SECONDS = 10
+READ_YOUR_WRITES_COOKIE = 'read_primary'
+
+
+# Write views run in BEGIN IMMEDIATE transactions and are retried up
+# to SQLITE_WRITE_RETRIES times if the database is still locked once
+# busy_timeout runs out, sleeping a random time up to
+# SQLITE_RETRY_BACKOFF * 2 ** attempt (at most SQLITE_RETRY_MAX_BACKOFF)
+# seconds in between. `manage.py contention_stats` shows how often.
+SQLITE_WRITE_RETRIES = 3
+SQLITE_RETRY_BACKOFF = 0.05
+SQLITE_RETRY_MAX_BACKOFF = 1.0
+
+
+# Cache
+# https://docs.djangoproject.com/en/1.11/topics/cache/
+# Rendered list fragments are keyed on a per-list version stored in the
+# cache, so every gunicorn worker has to see the same cache. The login
+# rate limits and contention counters also need add() and incr() to be
+# atomic across workers. Memcached and Redis are; the stock
+# FileBasedCache isn't, so production uses a locked subclass of it.
+#
+# Once a cache holds MAX_ENTRIES keys it throws away a random share of
+# them. Anyone can fill 'default' with list pages, so rate limit counts
+# and sessions each get a cache of their own that only they can evict.
+
+CACHE_MAX_ENTRIES = {
+    'default': 300,
+    'ratelimit': 10000,
+    'sessions': 10000,
+}
+
+if 'DJANGO_DEBUG_FALSE' in os.environ:
+    CACHES = {
+        alias: {
+            'BACKEND': 'superlists.cache.LockedFileBasedCache',
+            'LOCATION': os.path.join(
+                BASE_DIR, '../cache', '' if alias == 'default' else alias
+            ),
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+        for alias, max_entries in CACHE_MAX_ENTRIES.items()
+    }
+else:
+    CACHES = {
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': alias,
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+        for alias, max_entries in CACHE_MAX_ENTRIES.items()
+    }
+
+LIST_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Sessions
+# https://docs.djangoproject.com/en/1.11/topics/http/sessions/
+# DJANGO_SESSION_BACKEND picks where sessions live:
+#   cached_db       the cache, falling back to django_session (default)
+#   cache           the cache only; a cache flush logs everyone out
+#   signed_cookies  the client, in a signed cookie; no server storage
+#   db              django_session on every request
+# `manage.py benchmark_sessions` compares them.
+
+SESSION_ENGINES = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get('DJANGO_SESSION_BACKEND', 'cached_db')
+]
+SESSION_CACHE_ALIAS = 'sessions'
+
+# view_list shows this many items per page; ?page_size= can ask for up
+# to LIST_MAX_PAGE_SIZE.
+LIST_PAGE_SIZE = 100
+LIST_MAX_PAGE_SIZE = 1000
+
+# Streamed list pages fetch and render this many items at a time.
+LIST_STREAM_CHUNK_SIZE = 500
+
+SEARCH_PAGE_SIZE = 20
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
 
@@ -143,6 +283,42 @@ LOGGING = {
     'root': {'level': 'INFO'},
 }
 
+# PasswordlessAuthenticationBackend.get_user keeps up to
+# USER_CACHE_SIZE users per process for USER_CACHE_TTL seconds. Set
+# USER_CACHE_ALIAS to one of the CACHES to share them between workers.
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 5 * 60
+USER_CACHE_ALIAS = None
+
+# Outgoing email is queued in accounts.QueuedEmail and sent by
+# `manage.py send_queued_emails`. A failed send is retried after
+# OUTBOX_RETRY_DELAY seconds, doubling each time up to
+# OUTBOX_RETRY_MAX_DELAY, and given up on after OUTBOX_MAX_ATTEMPTS.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_RETRY_DELAY = 30
+OUTBOX_RETRY_MAX_DELAY = 60 * 60
+# How long a worker has to send a batch before another may claim it.
+OUTBOX_LEASE = 5 * 60
+
+# send_login_email takes at most this many requests per window of
+# seconds for any one email address and any one client IP.
+LOGIN_EMAIL_RATE_LIMITS = {
+    'email': (5, 60 * 60),
+    'ip': (20, 60 * 60),
+}
+RATELIMIT_CACHE_ALIAS = 'ratelimit'
+# gunicorn listens on a unix socket, so behind nginx the client address
+# only arrives in the X-Real-IP header it sets.
+if 'DJANGO_DEBUG_FALSE' in os.environ:
+    CLIENT_IP_META_KEY = 'HTTP_X_REAL_IP'
+else:
+    CLIENT_IP_META_KEY = 'REMOTE_ADDR'
+
+# Login links stop working after this many seconds, and
+# `manage.py purge_tokens` deletes their tokens.
+LOGIN_TOKEN_TTL = 60 * 60
+
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = 'playcocwidraka@gmail.com'
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASSWORD')
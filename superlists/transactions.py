@@ -0,0 +1,141 @@
+import functools
+import inspect
+import logging
+import random
+import time
+from contextlib import contextmanager, nullcontext
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, transaction
+
+logger = logging.getLogger(__name__)
+
+CONTENTION_EVENTS = ('busy', 'failed')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _contention_key(event):
+    return f'db:contention:{event}'
+
+
+def record_contention(event):
+    """Count a contention event in the shared cache, so the totals
+    cover every worker."""
+    key = _contention_key(event)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def contention_stats():
+    return {
+        event: cache.get(_contention_key(event), 0)
+        for event in CONTENTION_EVENTS
+    }
+
+
+def reset_contention_stats():
+    cache.delete_many([_contention_key(event) for event in CONTENTION_EVENTS])
+
+
+def is_busy_error(error):
+    message = str(error)
+    return 'database is locked' in message or 'database is busy' in message
+
+
+@contextmanager
+def immediate_atomic(using=None, savepoint=True):
+    """Like transaction.atomic, but an outermost transaction on SQLite
+    starts with BEGIN IMMEDIATE, taking the write lock at once.
+
+    Nested inside another atomic block it's just a savepoint, or
+    nothing at all with savepoint=False.
+    """
+    connection = transaction.get_connection(using)
+    immediate = (
+        hasattr(connection, 'begin_immediate')
+        and not connection.in_atomic_block
+    )
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using, savepoint=savepoint):
+            connection.begin_immediate = False
+            yield
+    finally:
+        connection.begin_immediate = False
+
+
+def _backoff(attempt):
+    # Full jitter, so workers that collided don't all retry together.
+    ceiling = min(
+        settings.SQLITE_RETRY_BACKOFF * 2 ** attempt,
+        settings.SQLITE_RETRY_MAX_BACKOFF,
+    )
+    return random.uniform(0, ceiling)
+
+
+def retry_on_busy(func, using=None, atomic=True):
+    """Run func() in an immediate_atomic block, retrying it from the
+    start while SQLite reports the database is locked.
+
+    With atomic=False each attempt runs outside any transaction, for a
+    func() that opens its own on whichever databases it writes to.
+
+    Inside an existing transaction there's nothing safe to retry, so
+    errors are left for the outer block to handle.
+    """
+    attempts = settings.SQLITE_WRITE_RETRIES + 1
+    for attempt in range(attempts):
+        in_outer_transaction = transaction.get_connection(
+            using
+        ).in_atomic_block
+        try:
+            with immediate_atomic(using=using) if atomic else nullcontext():
+                return func()
+        except OperationalError as error:
+            if in_outer_transaction or not is_busy_error(error):
+                raise
+            record_contention('busy')
+            if attempt == attempts - 1:
+                record_contention('failed')
+                logger.error('Gave up after %d locked attempts', attempts)
+                raise
+            logger.warning('Database locked, retrying (attempt %d)',
+                           attempt + 1)
+            time.sleep(_backoff(attempt))
+
+
+def write_transaction(view):
+    """Run a view's unsafe requests through retry_on_busy, leaving GETs
+    as they are so reads never queue for the write lock.
+
+    A view that takes a list_id gets its transaction on that list's
+    shard, so writes to lists on different shards don't wait for each
+    other. Users and list ids live on the default database, and the
+    steps that create them (List.share_with, allocate_list_ids) commit
+    there on their own rather than holding it for the whole view.
+
+    A view without a list_id, such as new_list, can't know its shard
+    beforehand. It's retried without an outer transaction, and
+    List.create_new writes the list and its first item in one of its
+    own.
+    """
+    signature = inspect.signature(view)
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        attempt = functools.partial(view, request, *args, **kwargs)
+        list_id = signature.bind(request, *args, **kwargs).arguments.get(
+            'list_id'
+        )
+        if list_id is None:
+            return retry_on_busy(attempt, atomic=False)
+        from lists.sharding import shard_for_list
+        return retry_on_busy(attempt, using=shard_for_list(list_id))
+    return wrapper
@@ -16,6 +16,7 @@ Including another URLconf
 from django.conf.urls import include, url
 
 from accounts import urls as accounts_urls
+from lists import api_urls as list_api_urls
 from lists import views as list_views
 from lists import urls as list_urls
 # we use the import x as y syntax to alias views and urls. This is
@@ -25,5 +26,6 @@ from lists import urls as list_urls
 urlpatterns = [
     url(r'^$', list_views.home_page, name='home'),
     url(r'^lists/', include(list_urls)),
+    url(r'^api/lists/', include(list_api_urls)),
     url(r'^accounts/', include(accounts_urls)),
 ]